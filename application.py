@@ -1,12 +1,18 @@
 
-import os, sys, json, traceback
+import os, sys, json, time, heapq, traceback, asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Header
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
 
 APP_VERSION = os.getenv("APP_VERSION", "3.2.1")
 ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+MATCHES_CONCURRENCY = int(os.getenv("MATCHES_CONCURRENCY", "8"))
+MATCHES_BUDGET_MS = int(os.getenv("MATCHES_BUDGET_MS", "25000"))
+MATCHES_STREAM_TOP = int(os.getenv("MATCHES_STREAM_TOP", "50"))
+MATCHES_BATCH_MAX = int(os.getenv("MATCHES_BATCH_MAX", "500"))
 
 print("=== Phoenix Recruiting boot ===", flush=True)
 print("APP_VERSION=", APP_VERSION, flush=True)
@@ -14,6 +20,8 @@ print("PYTHONPATH=", os.getenv("PYTHONPATH"), flush=True)
 
 # Import with graceful fallback so the server always binds to PORT
 IMPORT_ISSUES = {}
+from utils.metrics import metrics, tracing
+
 try:
     from scraping.async_scraper import AsyncScraper
 except Exception as e:
@@ -21,25 +29,113 @@ except Exception as e:
     AsyncScraper = None
 
 try:
-    from scraping.discovery import discover_programs, discovery_cache, rebuild_index
+    from scraping.http import http_pool
+except Exception as e:
+    IMPORT_ISSUES["http"] = str(e)
+    http_pool = None
+
+try:
+    from scraping.parsing import parse_pool
+except Exception as e:
+    IMPORT_ISSUES["parsing"] = str(e)
+    parse_pool = None
+
+try:
+    from scraping.cache import cache_stats as _cache_stats, cache_clear as _cache_clear, caches as _caches
+except Exception as e:
+    IMPORT_ISSUES["cache"] = str(e)
+    _caches = {}
+    def _cache_stats(**kwargs): return {"namespaces": {}}
+    def _cache_clear(namespace=None): pass
+
+try:
+    from scraping.hosthealth import host_health
+except Exception as e:
+    IMPORT_ISSUES["hosthealth"] = str(e)
+    host_health = None
+
+try:
+    from scraping.scheduler import fetch_scheduler
+except Exception as e:
+    IMPORT_ISSUES["scheduler"] = str(e)
+    fetch_scheduler = None
+
+try:
+    from scraping.rawstore import raw_store
+except Exception as e:
+    IMPORT_ISSUES["rawstore"] = str(e)
+    raw_store = None
+
+try:
+    from scraping.history import roster_history
+except Exception as e:
+    IMPORT_ISSUES["history"] = str(e)
+    roster_history = None
+
+try:
+    from scraping.snapshot import index_snapshot, build_snapshot, export_snapshot, INDEX_NAMESPACES, ROSTER_NAMESPACES
+except Exception as e:
+    IMPORT_ISSUES["snapshot"] = str(e)
+    index_snapshot = None
+
+try:
+    from scraping.singleflight import singleflight_stats
+except Exception as e:
+    IMPORT_ISSUES["singleflight"] = str(e)
+    def singleflight_stats(): return {}
+
+try:
+    from scraping.probes import probe_planner
+except Exception as e:
+    IMPORT_ISSUES["probes"] = str(e)
+    probe_planner = None
+
+try:
+    from scraping.discovery import discover_programs, rebuild_index, revalidator, decode_continuation, stop_crawls
 except Exception as e:
     IMPORT_ISSUES["discovery"] = str(e)
     discover_programs = None
-    class _NullCache:
-        def clear(self): pass
-        def stats(self): return {"size":0}
-    discovery_cache = _NullCache()
+    revalidator = None
+    async def stop_crawls(): pass
+    def decode_continuation(token): raise ValueError("discovery unavailable")
     async def rebuild_index(**kwargs):
         return {"ok": False, "error":"discovery unavailable", "kwargs": kwargs}
 
 try:
-    from utils.scoring import calculate_recruiting_propensity, final_match_score
+    from scraping.warmup import WarmupScheduler
+    warmup = WarmupScheduler(rebuild_index) if discover_programs else None
+except Exception as e:
+    IMPORT_ISSUES["warmup"] = str(e)
+    warmup = None
+
+try:
+    from utils.scoring import (
+        final_match_score, propensity_from_count, propensity_from_features,
+        position_index, players_at_position, normalize_position,
+    )
 except Exception as e:
     IMPORT_ISSUES["scoring"] = str(e)
-    def calculate_recruiting_propensity(players): return 0.5
     def final_match_score(prop, class_level): return 50.0
+    def propensity_from_count(n): return 0.5
+    def propensity_from_features(features, position): return 0.5
+    def position_index(players): return {"": len(players)}
+    def players_at_position(index, position): return sum(index.values())
+    def normalize_position(position): return (position or "").strip().lower()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if http_pool: await http_pool.start()
+    if index_snapshot: index_snapshot.open()  # metadata only; entries are read per key on first use
+    if warmup: warmup.start()
+    try:
+        yield
+    finally:
+        if warmup: await warmup.stop()
+        await stop_crawls()
+        if http_pool: await http_pool.close()
+        if parse_pool: parse_pool.close()
 
-app = FastAPI(title="Phoenix Recruiting API", version=APP_VERSION)
+app = FastAPI(title="Phoenix Recruiting API", version=APP_VERSION, lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
 scraper = AsyncScraper() if AsyncScraper else None
@@ -52,11 +148,92 @@ class MatchesRequest(BaseModel):
     states: Optional[List[str]] = None
     debug: Optional[bool] = False
 
+class MatchProfile(BaseModel):
+    position: str
+    class_level: str
+    id: Optional[str] = None
+
+class BatchMatchesRequest(BaseModel):
+    sport: str
+    profiles: List[MatchProfile]
+    region: Optional[str] = None
+    states: Optional[List[str]] = None
+    debug: Optional[bool] = False
+
 def _meta(d: dict) -> dict:
     d.setdefault("_meta", {})["app_version"] = APP_VERSION
     if IMPORT_ISSUES: d["_meta"]["import_issues"] = IMPORT_ISSUES
     return d
 
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def _stream_format(stream: Optional[str]) -> Optional[str]:
+    if not stream: return None
+    fmt = stream.strip().lower()
+    if fmt not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="stream must be one of: " + ", ".join(STREAM_MEDIA_TYPES))
+    return fmt
+
+def _stream_response(events, fmt: str) -> StreamingResponse:
+    async def body():
+        async for kind, data in events:
+            line = json.dumps({"type": kind, **data} if fmt == "ndjson" else data, default=str)
+            yield line + "\n" if fmt == "ndjson" else "event: {}\ndata: {}\n\n".format(kind, line)
+    return StreamingResponse(body(), media_type=STREAM_MEDIA_TYPES[fmt],
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# what is left of a request's budget, handed to discover_programs so discovery and scraping share one deadline
+def _remaining_ms(deadline: Optional[float]) -> Optional[float]:
+    return max(1.0, 1000.0 * (deadline - time.monotonic())) if deadline is not None else None
+
+# yields queue items as they arrive until `task` finishes, then whatever is left in the queue
+async def _drain_until(task: asyncio.Future, queue: asyncio.Queue, deadline: Optional[float] = None):
+    while not task.done():
+        getter = asyncio.ensure_future(queue.get())
+        timeout = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+        done, _ = await asyncio.wait({getter, task}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if getter in done:
+            yield getter.result()
+            continue
+        getter.cancel()
+        if not done: return  # deadline
+    while not queue.empty():
+        yield queue.get_nowait()
+
+# component stats already tracked elsewhere, read only when /metrics is scraped
+@metrics.collector
+def _component_metrics():
+    out = []
+    for ns, c in _caches.items():
+        out += [("cache_hits_total", "counter", {"namespace": ns, "tier": "memory"}, c.hits),
+                ("cache_hits_total", "counter", {"namespace": ns, "tier": "disk"}, c.disk_hits),
+                ("cache_hits_total", "counter", {"namespace": ns, "tier": "snapshot"}, c.snapshot_hits)]
+    out += [("cache_misses_total", "counter", {"namespace": ns}, c.misses) for ns, c in _caches.items()]
+    out += [("cache_evictions_total", "counter", {"namespace": ns}, c.evictions) for ns, c in _caches.items()]
+    out += [("cache_memory_items", "gauge", {"namespace": ns}, len(c._mem)) for ns, c in _caches.items()]
+    flights = singleflight_stats()
+    out += [("singleflight_calls_total", "counter", {"flight": n}, f.get("calls", 0)) for n, f in flights.items()]
+    out += [("singleflight_coalesced_total", "counter", {"flight": n}, f.get("coalesced", 0)) for n, f in flights.items()]
+    if fetch_scheduler:
+        st = fetch_scheduler.stats()
+        out.append(("fetch_inflight", "gauge", {}, st["inflight"]))
+        out += [("fetch_waiting", "gauge", {"priority": p}, n) for p, n in st["waiting"].items()]
+        out += [("fetch_granted_total", "counter", {"priority": p}, n) for p, n in st["granted"].items()]
+        out.append(("fetch_throttled_total", "counter", {}, st["throttled"]))
+        out.append(("fetch_rate_limited_total", "counter", {}, st["rate_limited_429"]))
+    if host_health:
+        st = host_health.stats(limit=0)
+        out += [("hosts", "gauge", {"state": k}, n) for k, n in st["states"].items()]
+        out.append(("circuit_rejected_total", "counter", {}, st["rejected"]))
+        out.append(("hedged_requests_total", "counter", {}, st["hedged"]))
+        out.append(("hedge_wins_total", "counter", {}, st["hedge_wins"]))
+    if raw_store:
+        out.append(("raw_store_fresh_hits_total", "counter", {}, raw_store.fresh_hits))
+        out.append(("raw_store_not_modified_total", "counter", {}, raw_store.not_modified))
+    if parse_pool:
+        out.append(("parse_queue_depth", "gauge", {}, parse_pool.queue_depth))
+    return out
+
 @app.get("/")
 async def root():
     return _meta({"ok": True})
@@ -66,22 +243,82 @@ async def health():
     return _meta({"status":"ok"})
 
 @app.get("/cache/stats")
-async def cache_stats():
-    return _meta(discovery_cache.stats())
+async def cache_stats(
+    namespace: Optional[str] = None,
+    entries: int = 0,
+    offset: int = 0,
+    q: Optional[str] = None,
+    min_age_seconds: Optional[float] = None,
+    max_age_seconds: Optional[float] = None,
+):
+    stats = _cache_stats(namespace=namespace, entries=entries, offset=offset, contains=q, min_age=min_age_seconds, max_age=max_age_seconds)
+    return _meta({
+        **stats, "singleflight": singleflight_stats(),
+        "raw_store": raw_store.stats() if raw_store else None,
+        "probe_planner": probe_planner.stats() if probe_planner else None,
+        "roster_history": roster_history.stats() if roster_history else None,
+        "snapshot": index_snapshot.stats() if index_snapshot else None,
+        "revalidation": revalidator.stats() if revalidator else None,
+        "warmup": warmup.stats() if warmup else None,
+    })
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/http/stats")
+async def http_stats():
+    return _meta(http_pool.stats() if http_pool else {"open": False})
+
+@app.get("/hosts/health")
+async def hosts_health(state: Optional[str] = None, limit: int = 100):
+    return _meta(host_health.stats(state=state, limit=limit) if host_health else {"hosts_tracked": 0})
+
+@app.get("/fetch/stats")
+async def fetch_stats():
+    return _meta(fetch_scheduler.stats() if fetch_scheduler else {"inflight": 0})
+
+@app.get("/parse/stats")
+async def parse_stats():
+    return _meta(parse_pool.stats() if parse_pool else {"kind": None})
+
+@app.get("/rosters/history")
+async def rosters_history(url: str, limit: int = 100):
+    if not (roster_history and roster_history.enabled):
+        raise HTTPException(status_code=503, detail="Roster history disabled")
+    res = await asyncio.to_thread(roster_history.history, url, limit)
+    if res is None:
+        raise HTTPException(status_code=404, detail="No snapshots for that roster URL.")
+    return _meta(res)
 
 @app.get("/cache/clear")
-async def cache_clear_get():
-    discovery_cache.clear()
+async def cache_clear_get(namespace: Optional[str] = None):
+    _cache_clear(namespace)
+    if raw_store and namespace in (None, "raw"): raw_store.clear()
+    if roster_history and namespace == "history": roster_history.clear()
     return _meta({"ok": True})
 
 @app.post("/cache/clear")
-async def cache_clear_post():
-    discovery_cache.clear()
+async def cache_clear_post(namespace: Optional[str] = None):
+    _cache_clear(namespace)
+    if raw_store and namespace in (None, "raw"): raw_store.clear()
+    if roster_history and namespace == "history": roster_history.clear()
     return _meta({"ok": True})
 
+# a continuation token carries the original query, so `sport` may be omitted when resuming
+def _continued_sport(sport: Optional[str], continuation: Optional[str]) -> str:
+    if continuation:
+        try:
+            return ",".join(decode_continuation(continuation)["sports"])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if not sport:
+        raise HTTPException(status_code=400, detail="Provide sport (or a continuation token)")
+    return sport
+
 @app.post("/rebuild-index")
 async def rebuild_index_endpoint(
-    sport: str,
+    sport: Optional[str] = None,
     region: Optional[str] = None,
     states: Optional[str] = None,
     sources: str = "governing,vendors,wiki",
@@ -89,22 +326,48 @@ async def rebuild_index_endpoint(
     include_njcaa: bool = False,
     cache_hours: Optional[float] = None,
     diag: bool = False,
+    force: bool = False,
+    budget_ms: Optional[float] = None,
+    continuation: Optional[str] = None,
     x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token"),
 ):
     if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
         raise HTTPException(status_code=401, detail="Unauthorized")
     if not rebuild_index:
         raise HTTPException(status_code=503, detail="Indexing unavailable (discovery import failed)")
+    sport = _continued_sport(sport, continuation)
     states_list = [x.strip().upper() for x in states.split(",")] if states else None
-    payload = await rebuild_index(
-        sport=sport, region=region, states=states_list, sources=sources,
-        include_diii=include_diii, include_njcaa=include_njcaa, cache_hours=cache_hours, diag=diag
-    )
+    sports = [x.strip() for x in sport.split(",") if x.strip()]
+    try:
+        payload = await rebuild_index(
+            sport=sports if len(sports) > 1 else sport, region=region, states=states_list, sources=sources,
+            include_diii=include_diii, include_njcaa=include_njcaa, cache_hours=cache_hours, diag=diag, force=force,
+            budget_ms=budget_ms, continuation=continuation
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _meta(payload)
+
+@app.post("/snapshot/export")
+async def snapshot_export(
+    targets: Optional[str] = None,
+    rosters: bool = False,
+    x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token"),
+):
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if not index_snapshot:
+        raise HTTPException(status_code=503, detail="Snapshots unavailable (import failed)")
+    # writes next to the served snapshot; this instance keeps reading the file it opened at startup
+    if targets:
+        payload = await build_snapshot(targets, rosters=rosters)
+    else:
+        payload = await asyncio.to_thread(export_snapshot, namespaces=INDEX_NAMESPACES + (ROSTER_NAMESPACES if rosters else ()))
     return _meta(payload)
 
 @app.get("/discover")
 async def discover(
-    sport: str,
+    sport: Optional[str] = None,
     region: Optional[str] = None,
     state: Optional[str] = None,
     states: Optional[str] = None,
@@ -113,68 +376,300 @@ async def discover(
     include_njcaa: bool = False,
     cache_hours: Optional[float] = None,
     diag: bool = False,
+    stream: Optional[str] = None,
+    budget_ms: Optional[float] = None,
+    continuation: Optional[str] = None,
 ):
     if not discover_programs:
         raise HTTPException(status_code=503, detail="Discovery unavailable (import failed)")
+    sport = _continued_sport(sport, continuation)
     states_list = [x.strip().upper() for x in states.split(",")] if states else ([state.strip().upper()] if state else None)
-    res = await discover_programs(
-        sport=sport, region=region, states=states_list, sources=sources,
-        include_diii=include_diii, include_njcaa=include_njcaa, cache_hours=cache_hours, diag=diag
-    )
+    fmt = _stream_format(stream)
+    if fmt:
+        return _stream_response(_discover_events(
+            sport=sport, region=region, states=states_list, sources=sources,
+            include_diii=include_diii, include_njcaa=include_njcaa, cache_hours=cache_hours, diag=diag,
+            budget_ms=budget_ms, continuation=continuation
+        ), fmt)
+    try:
+        res = await discover_programs(
+            sport=sport, region=region, states=states_list, sources=sources,
+            include_diii=include_diii, include_njcaa=include_njcaa, cache_hours=cache_hours, diag=diag,
+            budget_ms=budget_ms, continuation=continuation
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return _meta(res)
 
+# one "program" event per resolved roster as the crawl finds it, then a "summary" event with the usual payload minus the list
+async def _discover_events(**kwargs):
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.ensure_future(discover_programs(**kwargs, on_program=lambda sp, p: queue.put_nowait({"sport": sp, **p})))
+    seen = set()
+    try:
+        async for prog in _drain_until(task, queue):
+            seen.add((prog["sport"], prog["roster_url"]))
+            yield "program", prog
+        try:
+            res = task.result()
+        except ValueError as e:
+            yield "error", {"status": 400, "detail": str(e)}
+            return
+        per_sport = res["sports"] if "sports" in res else {kwargs["sport"]: res}
+        summary = {"count": res.get("count"), "sports": {}}
+        if res.get("partial"): summary.update(partial=True, continuation=res["continuation"])
+        for sp, r in per_sport.items():
+            for p in r.get("programs", []):
+                if (sp, p.get("roster_url")) not in seen:
+                    yield "program", {"sport": sp, **p}
+            summary["sports"][sp] = {k: v for k, v in r.items() if k != "programs"}
+        yield "summary", _meta(summary)
+    finally:
+        task.cancel()
+
+async def _scrape_program(p: dict, sport: str, sem: asyncio.Semaphore) -> Optional[dict]:
+    async with sem:
+        try:
+            data = await scraper.scrape_school(p.get("roster_url"), sport=sport)
+        except Exception:
+            return None
+    return data if data.get("players") else None
+
+def _match_row(p: dict, data: dict, considered: int, final: float, propensity: float) -> dict:
+    return {
+        "school": p.get("school"), "state": p.get("state"),
+        "association": p.get("association"), "division": p.get("division"),
+        "source_url": data.get("source_url") or p.get("roster_url"),
+        "players_considered": considered, "propensity": propensity, "final_score": final
+    }
+
+# history features when the roster has them, otherwise the plain position count
+def _school_propensity(data: dict, position: str):
+    t0 = time.perf_counter()
+    features = data.get("features")
+    if features and features.get("positions"):
+        n, propensity = players_at_position(features["positions"], position), propensity_from_features(features, position)
+    else:
+        n = players_at_position(data.get("positions") or position_index(data["players"]), position)
+        propensity = propensity_from_count(n)
+    metrics.record("score", time.perf_counter() - t0, {"source": "history" if features else "count"}, url=data.get("source_url"), position=position)
+    return n, propensity
+
+async def _score_program(p: dict, req: MatchesRequest, sem: asyncio.Semaphore) -> Optional[dict]:
+    data = await _scrape_program(p, req.sport, sem)
+    if data is None:
+        return None
+    considered, propensity = _school_propensity(data, req.position)
+    return _match_row(p, data, considered, final_match_score(propensity, req.class_level), propensity)
+
 @app.post("/matches")
 async def matches(
     req: MatchesRequest,
     sources: str = "governing,vendors,wiki",
     include_diii: bool = False,
     include_njcaa: bool = False,
-    cache_hours: Optional[float] = None
+    cache_hours: Optional[float] = None,
+    concurrency: Optional[int] = None,
+    budget_ms: Optional[int] = None,
+    stream: Optional[str] = None,
+    top: Optional[int] = None,
 ):
     if not (discover_programs and scraper):
         raise HTTPException(status_code=503, detail="Service unavailable (imports failed)")
-    try:
-        disc = await discover_programs(
-            sport=req.sport, region=req.region, states=req.states, sources=sources,
-            include_diii=include_diii, include_njcaa=include_njcaa, cache_hours=cache_hours, diag=req.debug or False
+    budget=(budget_ms if budget_ms is not None else MATCHES_BUDGET_MS)/1000.0
+    deadline=time.monotonic()+budget if budget>0 else None
+    sem=asyncio.Semaphore(max(1, concurrency or MATCHES_CONCURRENCY))
+    fmt = _stream_format(stream)
+    if fmt:
+        return _stream_response(_matches_events(
+            req, sem, deadline, top if top is not None else MATCHES_STREAM_TOP,
+            sources=sources, include_diii=include_diii, include_njcaa=include_njcaa, cache_hours=cache_hours
+        ), fmt)
+    # debug=true returns a per-stage trace of this request as "diag"
+    with tracing(bool(req.debug)) as trace:
+        payload = await _matches_payload(
+            req, sem, deadline, sources=sources, include_diii=include_diii, include_njcaa=include_njcaa, cache_hours=cache_hours
         )
+    if trace is not None: payload["diag"] = trace.summary()
+    return _meta(payload)
+
+async def _matches_payload(req: MatchesRequest, sem: asyncio.Semaphore, deadline: Optional[float], **kwargs) -> dict:
+    try:
+        disc = await discover_programs(sport=req.sport, region=req.region, states=req.states, budget_ms=_remaining_ms(deadline), **kwargs)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     programs = disc.get("programs", [])
     if not programs: 
+        if disc.get("partial"):
+            raise HTTPException(status_code=504, detail="Time budget exhausted before discovery found a roster URL.")
         raise HTTPException(status_code=404, detail="Could not discover roster URLs for that sport/region.")
-    results=[]
-    for p in programs:
-        roster_url = p.get("roster_url")
-        if not roster_url: 
-            continue
-        try:
-            data = await scraper.scrape_school(roster_url, sport=req.sport)
-        except Exception:
-            continue
-        players=data.get("players",[])
-        if not players: 
-            continue
-        pos=req.position.strip().lower()
-        filtered=[pl for pl in players if pos and pos in (pl.get("position","").lower())] or players
-        propensity=calculate_recruiting_propensity(filtered)
-        final = final_match_score(propensity, req.class_level)
-        results.append({
-            "school": p.get("school"), "state": p.get("state"),
-            "association": p.get("association"), "division": p.get("division"),
-            "source_url": data.get("source_url") or roster_url,
-            "players_considered": len(filtered), "propensity": propensity, "final_score": final
-        })
+    tasks=[asyncio.create_task(_score_program(p, req, sem)) for p in programs if p.get("roster_url")]
+    timeout=max(0.0, deadline-time.monotonic()) if deadline is not None else None
+    done, pending = (await asyncio.wait(tasks, timeout=timeout)) if tasks else (set(), set())
+    for t in pending: t.cancel()
+    results=[t.result() for t in tasks if t in done and t.result()]
+    partial=bool(pending) or bool(disc.get("partial"))
+    if not results and partial:
+        raise HTTPException(status_code=504, detail="Time budget exhausted before any roster page was parsed.")
     if not results: 
         raise HTTPException(status_code=404, detail="No valid roster pages parsed for that sport/region.")
     results.sort(key=lambda x: x["final_score"], reverse=True)
-    return _meta({
+    return {
         "count": len(results),
+        "partial": partial,
+        "pending": len(pending),
+        "results": results,
+        "discovery": {
+            "count": disc.get("count"),
+            "states": disc.get("states"),
+            "sport_slugs": disc.get("sport_slugs"),
+            "sources_used": disc.get("sources_used"),
+            "partial": bool(disc.get("partial")),
+        }
+    }
+
+# rosters are scored as soon as discovery yields them; each scored school is sent as a "result" event and only
+# the best `top` are kept for the closing "summary"
+async def _matches_events(req: MatchesRequest, sem: asyncio.Semaphore, deadline: Optional[float], top: int, **kwargs):
+    done_q: asyncio.Queue = asyncio.Queue()
+    tasks = {}
+    def start(p: dict):
+        url = p.get("roster_url")
+        if not url or url in tasks: return
+        t = asyncio.ensure_future(_score_program(p, req, sem))
+        t.add_done_callback(done_q.put_nowait); tasks[url] = t
+    disc_task = asyncio.ensure_future(discover_programs(
+        sport=req.sport, region=req.region, states=req.states, diag=req.debug or False,
+        on_program=lambda sp, p: start(p), budget_ms=_remaining_ms(deadline), **kwargs
+    ))
+    best: list = []; scored = 0; finished = 0; seq = 0
+    def keep(r: dict):
+        nonlocal seq
+        seq += 1
+        entry = (r["final_score"], -seq, r)
+        if len(best) < top: heapq.heappush(best, entry)
+        elif top > 0 and entry > best[0]: heapq.heapreplace(best, entry)
+    try:
+        async for t in _drain_until(disc_task, done_q, deadline):
+            finished += 1
+            r = t.result() if not t.cancelled() else None
+            if r:
+                scored += 1; keep(r)
+                yield "result", r
+        disc = {}
+        if disc_task.done():
+            try:
+                disc = disc_task.result()
+            except ValueError as e:
+                yield "error", {"status": 400, "detail": str(e)}
+                return
+            for p in disc.get("programs", []): start(p)
+        while finished < len(tasks):
+            timeout = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            try:
+                t = done_q.get_nowait() if not done_q.empty() else await asyncio.wait_for(done_q.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            finished += 1
+            r = t.result() if not t.cancelled() else None
+            if r:
+                scored += 1; keep(r)
+                yield "result", r
+        pending = len(tasks) - finished
+        if not tasks and disc_task.done():
+            if disc.get("partial"):
+                yield "error", {"status": 504, "detail": "Time budget exhausted before discovery found a roster URL."}
+                return
+            yield "error", {"status": 404, "detail": "Could not discover roster URLs for that sport/region."}
+            return
+        yield "summary", _meta({
+            "count": scored,
+            "partial": pending > 0 or not disc_task.done() or bool(disc.get("partial")),
+            "pending": pending,
+            "results": [r for _, _, r in sorted(best, reverse=True)],
+            "discovery": {
+                "count": disc.get("count"),
+                "states": disc.get("states"),
+                "sport_slugs": disc.get("sport_slugs"),
+                "sources_used": disc.get("sources_used"),
+                "partial": bool(disc.get("partial")),
+            }
+        })
+    finally:
+        disc_task.cancel()
+        for t in tasks.values(): t.cancel()
+
+@app.post("/matches/batch")
+async def matches_batch(
+    req: BatchMatchesRequest,
+    sources: str = "governing,vendors,wiki",
+    include_diii: bool = False,
+    include_njcaa: bool = False,
+    cache_hours: Optional[float] = None,
+    concurrency: Optional[int] = None,
+    budget_ms: Optional[int] = None,
+    top: Optional[int] = None,
+):
+    if not (discover_programs and scraper):
+        raise HTTPException(status_code=503, detail="Service unavailable (imports failed)")
+    if not req.profiles:
+        raise HTTPException(status_code=400, detail="profiles must not be empty")
+    if len(req.profiles) > MATCHES_BATCH_MAX:
+        raise HTTPException(status_code=400, detail="At most {} profiles per batch".format(MATCHES_BATCH_MAX))
+    budget=(budget_ms if budget_ms is not None else MATCHES_BUDGET_MS)/1000.0
+    deadline=time.monotonic()+budget if budget>0 else None
+    try:
+        disc = await discover_programs(
+            sport=req.sport, region=req.region, states=req.states, sources=sources,
+            include_diii=include_diii, include_njcaa=include_njcaa, cache_hours=cache_hours, diag=req.debug or False,
+            budget_ms=_remaining_ms(deadline)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    programs = [p for p in disc.get("programs", []) if p.get("roster_url")]
+    if not programs:
+        if disc.get("partial"):
+            raise HTTPException(status_code=504, detail="Time budget exhausted before discovery found a roster URL.")
+        raise HTTPException(status_code=404, detail="Could not discover roster URLs for that sport/region.")
+    # one scrape pass shared by every profile
+    sem=asyncio.Semaphore(max(1, concurrency or MATCHES_CONCURRENCY))
+    tasks=[asyncio.create_task(_scrape_program(p, req.sport, sem)) for p in programs]
+    timeout=max(0.0, deadline-time.monotonic()) if deadline is not None else None
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for t in pending: t.cancel()
+    schools=[(p, t.result()) for p, t in zip(programs, tasks) if t in done and t.result()]
+    if not schools:
+        raise HTTPException(status_code=504 if pending else 404,
+                            detail="Time budget exhausted before any roster page was parsed." if pending else "No valid roster pages parsed for that sport/region.")
+    # profiles sharing (position, class level) share one ranking; each school is scored once per distinct
+    # position from its position index, so the work is schools x distinct positions, not profiles x players
+    positions=list(dict.fromkeys(normalize_position(pr.position) for pr in req.profiles))
+    combos=list(dict.fromkeys((normalize_position(pr.position), (pr.class_level or "").lower()) for pr in req.profiles))
+    rankings={c: [] for c in combos}
+    for p, data in schools:
+        per_pos = {pos: _school_propensity(data, pos) for pos in positions}
+        for pos, cl in combos:
+            n, propensity = per_pos[pos]
+            rankings[(pos, cl)].append(_match_row(p, data, n, final_match_score(propensity, cl), propensity))
+    for rows in rankings.values():
+        rows.sort(key=lambda x: x["final_score"], reverse=True)
+    limit = top if top is not None and top >= 0 else None
+    results = []
+    for pr in req.profiles:
+        rows = rankings[(normalize_position(pr.position), (pr.class_level or "").lower())]
+        results.append({"profile": {"id": pr.id, "position": pr.position, "class_level": pr.class_level}, "count": len(rows), "results": rows[:limit] if limit is not None else rows})
+    return _meta({
+        "profiles": len(req.profiles),
+        "distinct_profiles": len(combos),
+        "schools_scored": len(schools),
+        "partial": bool(pending) or bool(disc.get("partial")),
+        "pending": len(pending),
         "results": results,
         "discovery": {
             "count": disc.get("count"),
             "states": disc.get("states"),
             "sport_slugs": disc.get("sport_slugs"),
             "sources_used": disc.get("sources_used"),
+            "partial": bool(disc.get("partial")),
         }
     })
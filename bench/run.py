@@ -0,0 +1,157 @@
+
+# Offline load test: python -m bench.run --states CA,OR,WA --schools 15 --out bench/results/local.json
+import os, sys, json, time, argparse, asyncio, resource, tempfile, platform
+from typing import Dict, Any, List, Optional
+
+def _args(argv:Optional[List[str]]=None)->argparse.Namespace:
+    ap=argparse.ArgumentParser(description="Benchmark /discover, /matches and /rebuild-index against a synthetic local web")
+    ap.add_argument("--states", default="CA,OR,WA", help="comma-separated state codes to generate")
+    ap.add_argument("--schools", type=int, default=15, help="schools per state")
+    ap.add_argument("--roster-size", type=int, default=60)
+    ap.add_argument("--latency-ms", type=float, default=40.0, help="mean synthetic server latency")
+    ap.add_argument("--jitter-ms", type=float, default=20.0)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    ap.add_argument("--requests", type=int, default=50, help="requests per warm scenario")
+    ap.add_argument("--concurrency", type=int, default=10, help="concurrent clients per warm scenario")
+    ap.add_argument("--cold-repeats", type=int, default=3, help="sequential runs per cold scenario (caches cleared before each)")
+    ap.add_argument("--scenarios", default="discover_cold,discover_warm,matches_cold,matches_warm,rebuild")
+    ap.add_argument("--host-rate", type=float, default=None, help="override HOST_RATE_PER_SEC (default: production setting)")
+    ap.add_argument("--out", default=None, help="write results JSON here (e.g. bench/baselines/<name>.json)")
+    ap.add_argument("--baseline", default=None, help="compare against a previous results JSON")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression before failing")
+    return ap.parse_args(argv)
+
+def _rss_mb()->float:
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1])*os.sysconf("SC_PAGE_SIZE")/1048576.0, 1)
+    except Exception:
+        return 0.0
+
+def _peak_rss_mb()->float:
+    peak=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak/1048576.0 if sys.platform=="darwin" else peak/1024.0, 1)
+
+def _pct(vals:List[float], q:float)->Optional[float]:
+    if not vals: return None
+    s=sorted(vals); return round(s[min(len(s)-1, int(q*len(s)))], 1)
+
+def _summary(latencies:List[float], statuses:List[int], wall:float, site_before:Dict[str,Any], site_after:Dict[str,Any])->Dict[str,Any]:
+    ok=[l for l, s in zip(latencies, statuses) if s==200]
+    return {
+        "requests":len(statuses), "ok":len(ok), "errors":len(statuses)-len(ok),
+        "statuses":{str(s):statuses.count(s) for s in sorted(set(statuses))},
+        "throughput_rps":round(len(statuses)/wall, 2) if wall>0 else None, "wall_s":round(wall, 3),
+        "p50_ms":_pct(ok, 0.5), "p90_ms":_pct(ok, 0.9), "p99_ms":_pct(ok, 0.99), "max_ms":_pct(ok, 1.0),
+        "mean_ms":round(sum(ok)/len(ok), 1) if ok else None,
+        "rss_mb":_rss_mb(), "peak_rss_mb":_peak_rss_mb(),
+        "upstream_requests":site_after["requests"]-site_before["requests"], "upstream_bytes":site_after["bytes"]-site_before["bytes"],
+    }
+
+async def _run(opts:argparse.Namespace)->Dict[str,Any]:
+    import aiohttp, uvicorn
+    from bench.site import RemoteSite, redirect
+    import application
+
+    states=[s.strip().upper() for s in opts.states.split(",") if s.strip()]
+    site=RemoteSite(states, opts.schools, opts.roster_size, opts.latency_ms, opts.jitter_ms, opts.error_rate)
+    await site.start(); redirect(site)
+    server=uvicorn.Server(uvicorn.Config(application.app, host="127.0.0.1", port=0, log_level="warning", lifespan="on"))
+    serve=asyncio.ensure_future(server.serve())
+    while not server.started: await asyncio.sleep(0.05)
+    port=server.servers[0].sockets[0].getsockname()[1]; base="http://127.0.0.1:{}".format(port)
+    query={"sport":"football", "states":",".join(states)}
+    match_body={"sport":"football", "position":"QB", "class_level":"Senior", "states":states}
+    scenarios={
+        "discover_cold":("GET", "/discover", query, None, True),
+        "discover_warm":("GET", "/discover", query, None, False),
+        "matches_cold":("POST", "/matches", {"budget_ms":0}, match_body, True),
+        "matches_warm":("POST", "/matches", {"budget_ms":0}, match_body, False),
+        "rebuild":("POST", "/rebuild-index", {**query, "force":"true"}, None, True),
+    }
+    results:Dict[str,Any]={}
+    timeout=aiohttp.ClientTimeout(total=600)
+    async with aiohttp.ClientSession(timeout=timeout) as client:
+        async def call(method, path, params, body):
+            t0=time.perf_counter()
+            async with client.request(method, base+path, params=params, json=body) as resp:
+                await resp.read()
+                return (time.perf_counter()-t0)*1000.0, resp.status
+        for name in [s.strip() for s in opts.scenarios.split(",") if s.strip()]:
+            if name not in scenarios:
+                print("unknown scenario:", name, file=sys.stderr); continue
+            method, path, params, body, cold = scenarios[name]
+            before=await site.stats(); lat=[]; st=[]
+            if cold:
+                for _ in range(opts.cold_repeats):
+                    async with client.post(base+"/cache/clear") as r: await r.read()
+                    l, s = await call(method, path, params, body); lat.append(l); st.append(s)
+                wall=sum(lat)/1000.0  # sequential; cache clearing is not counted
+            else:
+                await call(method, path, params, body)  # prime
+                before=await site.stats(); t0=time.perf_counter()
+                sem=asyncio.Semaphore(max(1, opts.concurrency))
+                async def one():
+                    async with sem:
+                        return await call(method, path, params, body)
+                for l, s in await asyncio.gather(*(one() for _ in range(opts.requests))):
+                    lat.append(l); st.append(s)
+                wall=time.perf_counter()-t0
+            results[name]=_summary(lat, st, wall, before, await site.stats())
+            print("{:<14} p50={:>8} p99={:>8} rps={:>7} ok={}/{} upstream={} rss={}MB".format(
+                name, results[name]["p50_ms"], results[name]["p99_ms"], results[name]["throughput_rps"],
+                results[name]["ok"], results[name]["requests"], results[name]["upstream_requests"], results[name]["rss_mb"]), flush=True)
+    server.should_exit=True; await serve; await site.stop()
+    return results
+
+# lower is better for latency and memory, higher for throughput
+COMPARE = {"p50_ms":-1, "p99_ms":-1, "mean_ms":-1, "throughput_rps":1, "peak_rss_mb":-1}
+
+def compare(current:Dict[str,Any], baseline:Dict[str,Any], tolerance:float)->List[str]:
+    regressions=[]
+    for name, cur in current.get("scenarios", {}).items():
+        base=baseline.get("scenarios", {}).get(name)
+        if not base: continue
+        for key, direction in COMPARE.items():
+            a, b = cur.get(key), base.get(key)
+            if not a or not b: continue
+            change=(a-b)/b
+            if -direction*change > tolerance:
+                regressions.append("{}.{}: {} -> {} ({:+.0%})".format(name, key, b, a, change))
+    return regressions
+
+def main(argv:Optional[List[str]]=None)->int:
+    opts=_args(argv)
+    # isolate every on-disk tier so runs are repeatable and never touch a real cache
+    tmp=tempfile.mkdtemp(prefix="phoenix-bench-")
+    os.environ.setdefault("CACHE_DB_PATH", os.path.join(tmp, "cache.sqlite3"))
+    os.environ.setdefault("RAW_STORE_PATH", os.path.join(tmp, "raw.sqlite3"))
+    os.environ.setdefault("ROSTER_HISTORY_PATH", os.path.join(tmp, "history.sqlite3"))
+    os.environ["SNAPSHOT_PATH"]=""  # a baked snapshot would turn every cold scenario warm
+    os.environ["WARMUP_TARGETS"]=""; os.environ["ADMIN_TOKEN"]=""
+    if opts.host_rate is not None: os.environ["HOST_RATE_PER_SEC"]=str(opts.host_rate)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    scenarios=asyncio.run(_run(opts))
+    keys=("APP_VERSION","HTML_BACKEND","PARSE_POOL_KIND","HOST_RATE_PER_SEC","FETCH_MAX_INFLIGHT","FETCH_PER_HOST","DISCOVERY_CONCURRENCY","MATCHES_CONCURRENCY")
+    report={
+        "created":time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config":{k:v for k, v in vars(opts).items() if k not in ("out","baseline")},
+        "env":{k:os.environ[k] for k in keys if k in os.environ},
+        "platform":{"python":platform.python_version(), "machine":platform.machine(), "cpus":os.cpu_count()},
+        "scenarios":scenarios,
+    }
+    if opts.out:
+        d=os.path.dirname(opts.out)
+        if d: os.makedirs(d, exist_ok=True)
+        with open(opts.out, "w") as f: json.dump(report, f, indent=2)
+        print("wrote", opts.out)
+    if opts.baseline:
+        with open(opts.baseline) as f: baseline=json.load(f)
+        regressions=compare(report, baseline, opts.tolerance)
+        for r in regressions: print("REGRESSION", r)
+        if regressions: return 1
+        print("no regressions beyond {:.0%} against {}".format(opts.tolerance, opts.baseline))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
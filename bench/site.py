@@ -0,0 +1,173 @@
+
+import os, sys, json, random, asyncio, argparse
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse, urlunparse
+from aiohttp import web
+from utils.regions import STATE_NAMES
+
+POSITIONS = ["QB","RB","WR","TE","OL","DL","LB","DB","K","P","S"]
+CLASSES = ["Fr.","So.","Jr.","Sr.","R-Fr.","Gr."]
+ASSOCIATIONS = ["NCAA Division I","NCAA Division II","NCAA Division I","NAIA","NCAA Division II"]
+
+# deterministic stand-in for Wikipedia and the athletics sites discovery crawls; pages are picked by the Host
+# header, so the client can give every synthetic host its own loopback address (see RemoteSite)
+class SyntheticSite:
+    def __init__(self, states:List[str], schools_per_state:int=15, roster_size:int=60, latency_ms:float=40.0,
+                 jitter_ms:float=20.0, error_rate:float=0.0, seed:int=7):
+        self.states=states; self.schools_per_state=schools_per_state; self.roster_size=roster_size
+        self.latency=latency_ms/1000.0; self.jitter=jitter_ms/1000.0; self.error_rate=error_rate
+        self.rng=random.Random(seed); self.seed=seed
+        self.port=0; self._runner:Optional[web.AppRunner]=None
+        self.requests=0; self.errors=0; self.bytes=0
+        self.schools=[self._school(st, i) for st in states for i in range(schools_per_state)]
+        self.by_slug={s["slug"]:s for s in self.schools}
+    def _school(self, st:str, i:int)->Dict[str,Any]:
+        slug="{}{}".format(st.lower(), i)
+        vendor="sidearm" if i % 2 == 0 else "presto"
+        return {"state":st, "i":i, "slug":slug, "name":"Bench College {} {}".format(st, i), "vendor":vendor,
+                "association":ASSOCIATIONS[i % len(ASSOCIATIONS)], "has_athletics": i % 10 != 9,
+                "athletics_host":"{}athletics.com".format(slug) if vendor=="sidearm" else "go{}.com".format(slug)}
+    # --- pages -----------------------------------------------------------------------------------------
+    def _wiki_state(self, state_name:str)->Optional[str]:
+        st=next((k for k, v in STATE_NAMES.items() if v.replace(" ","_")==state_name), None)
+        if st not in self.states: return None
+        rows="".join(
+            '<tr><td><a href="/wiki/Bench_College_{slug}">{name}</a><sup>[{i}]</sup></td><td>{assoc}</td><td>Bench Conference</td></tr>'.format(
+                slug=s["slug"], name=s["name"], i=s["i"], assoc=s["association"])
+            for s in self.schools if s["state"]==st)
+        filler="<p>{}</p>".format("Lorem ipsum dolor sit amet. "*40)*30
+        return ('<html><head><script>var x="<tr><td>NCAA</td></tr>";</script></head><body>{}'
+                '<table class="wikitable sortable"><tr><th>School</th><th>Association</th><th>Conference</th></tr>{}</table>'
+                '<table class="navbox"><tr><td><a href="https://example.org/">nav</a></td></tr></table></body></html>').format(filler, rows)
+    def _wiki_school(self, slug:str)->Optional[str]:
+        s=self.by_slug.get(slug)
+        if s is None: return None
+        ath='<tr><th>Athletics</th><td><a href="https://{}/">Athletics</a></td></tr>'.format(s["athletics_host"]) if s["has_athletics"] else ""
+        links="".join('<a href="/wiki/Link_{}">link {}</a>'.format(k, k) for k in range(80))
+        return ('<html><body><table class="infobox vcard"><tr><th>Website</th><td><a href="https://www.{}.edu/">site</a></td></tr>{}</table>'
+                '<div>{}</div></body></html>').format(slug, ath, links)
+    def _players(self, s:Dict[str,Any])->List[Tuple[str,str,str]]:
+        rng=random.Random("{}:{}".format(self.seed, s["slug"]))
+        return [("Player {} {}".format(s["slug"].upper(), k), rng.choice(POSITIONS), rng.choice(CLASSES)) for k in range(self.roster_size)]
+    def _sidearm_roster(self, s:Dict[str,Any])->str:
+        cards="".join(
+            "<li class='sidearm-roster-player'><div class='sidearm-roster-player-name'><h3>{}</h3></div>"
+            "<span class='sidearm-roster-player-position'>{}</span> <span>6-1 | 200 | {}</span></li>".format(n, p, c)
+            for n, p, c in self._players(s))
+        return ("<html><head><script src='https://cdn.sidearmsports.com/app.js'></script></head><body><nav>{}</nav>"
+                "<div class='sidearm-roster'><ul>{}</ul></div><footer>Powered by Sidearm</footer></body></html>").format(
+                    "<a href='/sports/football/schedule'>Schedule</a>"*20, cards)
+    def _presto_roster(self, s:Dict[str,Any])->str:
+        rows="".join("<tr><td>{}</td><td><a href='/bio/{}'>{}</a></td><td>{}</td><td>{}</td></tr>".format(k, k, n, p, c)
+                     for k, (n, p, c) in enumerate(self._players(s)))
+        return ("<html><head><link href='https://www.prestosports.com/style.css'></head><body>"
+                "<table class='roster'><thead><tr><th>No.</th><th>Name</th><th>Pos.</th><th>Cl.</th></tr></thead><tbody>{}</tbody></table>"
+                "</body></html>").format(rows)
+    def _athletics(self, host:str, path:str)->Optional[str]:
+        s=next((x for x in self.schools if x["athletics_host"]==host), None)
+        if s is None: return None
+        path=path.rstrip("/").lower()
+        if path=="":
+            return "<html><body><a href='/sports/football'>Football</a><a href='/sports/baseball'>Baseball</a></body></html>"
+        if s["vendor"]=="sidearm" and path=="/sports/football/roster":
+            return self._sidearm_roster(s)
+        if s["vendor"]=="presto" and path=="/football/roster":
+            return self._presto_roster(s)
+        return None
+    def page(self, host:str, path:str)->Optional[str]:
+        if host=="en.wikipedia.org":
+            if path.startswith("/wiki/List_of_college_athletic_programs_in_"):
+                return self._wiki_state(path.rsplit("_in_", 1)[1])
+            if path.startswith("/wiki/Bench_College_"):
+                return self._wiki_school(path.rsplit("_", 1)[1])
+            return None
+        return self._athletics(host, path)
+    # --- server --------------------------------------------------------------------------------------
+    async def _handle(self, request:web.Request)->web.Response:
+        if request.path=="/__bench/stats": return web.json_response(self.stats())
+        self.requests+=1
+        host=request.headers.get("Host", "").lower()
+        await asyncio.sleep(max(0.0, self.rng.gauss(self.latency, self.jitter)))
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors+=1
+            return web.Response(status=503, text="unavailable")
+        body=self.page(host, request.path)
+        if body is None:
+            return web.Response(status=404, text="not found")
+        self.bytes+=len(body)
+        return web.Response(text=body, content_type="text/html")
+    async def start(self):
+        app=web.Application(); app.router.add_route("GET", "/{tail:.*}", self._handle)
+        self._runner=web.AppRunner(app, access_log=None); await self._runner.setup()
+        tcp=web.TCPSite(self._runner, "0.0.0.0", 0); await tcp.start()
+        self.port=tcp._server.sockets[0].getsockname()[1]
+    async def stop(self):
+        if self._runner is not None: await self._runner.cleanup(); self._runner=None
+    def stats(self)->Dict[str,Any]:
+        return {"requests":self.requests, "errors":self.errors, "bytes":self.bytes}
+
+# runs SyntheticSite in a child process so its latency sleeps and page rendering never compete with the app's
+# event loop or count towards its RSS; every synthetic host gets its own loopback address so per-host connection
+# limits, buckets and health tracking behave as in production
+class RemoteSite:
+    def __init__(self, states:List[str], schools_per_state:int=15, roster_size:int=60, latency_ms:float=40.0,
+                 jitter_ms:float=20.0, error_rate:float=0.0, seed:int=7):
+        self.args=["--states", ",".join(states), "--schools", str(schools_per_state), "--roster-size", str(roster_size),
+                   "--latency-ms", str(latency_ms), "--jitter-ms", str(jitter_ms), "--error-rate", str(error_rate), "--seed", str(seed)]
+        self.hosts:Dict[str,str]={}; self.port=0; self.pid=None; self._proc=None
+    async def start(self):
+        root=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self._proc=await asyncio.create_subprocess_exec(sys.executable, "-m", "bench.site", *self.args, cwd=root,
+                                                         stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
+        line=await self._proc.stdout.readline()
+        if not line: raise RuntimeError("synthetic site exited with {}".format(await self._proc.wait()))
+        self.port=json.loads(line)["port"]; self.pid=self._proc.pid
+    async def stop(self):
+        if self._proc is None: return
+        self._proc.stdin.close()  # the child exits when its stdin closes
+        try:
+            await asyncio.wait_for(self._proc.wait(), 10)
+        except asyncio.TimeoutError:
+            self._proc.kill(); await self._proc.wait()
+        self._proc=None
+    def ip_for(self, host:str)->str:
+        ip=self.hosts.get(host)
+        if ip is None:
+            n=len(self.hosts)+1
+            ip=self.hosts[host]="127.{}.{}.{}".format(1+(n>>16)%254, (n>>8)%256, n%256)
+        return ip
+    def rewrite(self, url:str)->str:
+        u=urlparse(url)
+        return urlunparse(("http", "{}:{}".format(self.ip_for(u.netloc.lower()), self.port), u.path or "/", u.params, u.query, ""))
+    async def stats(self)->Dict[str,Any]:
+        import aiohttp
+        async with aiohttp.ClientSession() as s:
+            async with s.get("http://127.0.0.1:{}/__bench/stats".format(self.port)) as r:
+                return {**await r.json(), "hosts":len(self.hosts)}
+
+# route every outbound request of the app to the synthetic site, keeping the original URL everywhere else
+# (raw store keys, host health, scheduler buckets); the original host travels in the Host header
+def redirect(site:RemoteSite):
+    from scraping import http
+    original=http._request
+    async def _request(session, url, headers, timeout):
+        return await original(session, site.rewrite(url), {**headers, "Host":urlparse(url).netloc.lower()}, timeout)
+    http._request=_request
+    return original
+
+async def _serve(opts:argparse.Namespace):
+    site=SyntheticSite([s.strip().upper() for s in opts.states.split(",") if s.strip()], opts.schools, opts.roster_size,
+                       opts.latency_ms, opts.jitter_ms, opts.error_rate, opts.seed)
+    await site.start()
+    print(json.dumps({"port":site.port}), flush=True)
+    loop=asyncio.get_running_loop()
+    await loop.run_in_executor(None, sys.stdin.read)
+    await site.stop()
+
+if __name__ == "__main__":
+    ap=argparse.ArgumentParser(description="Serve the synthetic site until stdin closes (started by bench.run)")
+    ap.add_argument("--states", default="CA,OR,WA"); ap.add_argument("--schools", type=int, default=15)
+    ap.add_argument("--roster-size", type=int, default=60); ap.add_argument("--latency-ms", type=float, default=40.0)
+    ap.add_argument("--jitter-ms", type=float, default=20.0); ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=7)
+    asyncio.run(_serve(ap.parse_args()))
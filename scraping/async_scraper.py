@@ -1,79 +1,56 @@
-import re, time
+import re, os, time, asyncio
 from typing import Dict, Any, List, Optional
 from urllib.parse import urlparse
-import aiohttp
 from bs4 import BeautifulSoup
+from scraping.http import http_pool, fetch_text
+from scraping.cache import TieredCache
+from scraping.singleflight import SingleFlight
+from scraping.parsing import parse_pool
+from scraping.extract import players_from_soup, extract_players
+from scraping.history import roster_history
+from utils.scoring import position_index
+from utils.metrics import metrics
 
-CACHE_TTL_SECONDS = 30 * 24 * 3600
+CACHE_TTL_SECONDS = float(os.getenv("ROSTER_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+ROSTER_CACHE_MAX_ITEMS = int(os.getenv("ROSTER_CACHE_MAX_ITEMS", "2048"))
+ROSTER_CACHE_MAX_BYTES = int(os.getenv("ROSTER_CACHE_MAX_MB", "64")) * 1024 * 1024
 
-class _Cache:
-    def __init__(self):
-        self.data = {}
-        self.ts = {}
-    def get(self, key:str):
-        if key in self.ts and (time.time()-self.ts[key]) < CACHE_TTL_SECONDS:
-            return self.data.get(key)
-        return None
-    def set(self, key:str, value):
-        self.data[key]=value; self.ts[key]=time.time()
-
-_cache = _Cache()
+# kept as plain objects: /matches reads every cached roster per request, and rebuilding the player rows on each
+# hit halved warm throughput (see bench matches_warm)
+_cache = TieredCache("rosters", CACHE_TTL_SECONDS, max_items=ROSTER_CACHE_MAX_ITEMS, max_bytes=ROSTER_CACHE_MAX_BYTES, compact=False)
+_scrape_flight = SingleFlight("rosters")
 
 class AsyncScraper:
     def __init__(self, timeout:int=20): self.timeout=timeout
     async def _get_html(self, url:str)->str:
-        headers={"User-Agent":"Mozilla/5.0","Accept":"text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"}
-        conn=aiohttp.TCPConnector(ssl=False, limit=10)
-        async with aiohttp.ClientSession(connector=conn, timeout=aiohttp.ClientTimeout(total=self.timeout), headers=headers) as s:
-            async with s.get(url) as r:
-                r.raise_for_status(); return await r.text()
+        _, text = await fetch_text(http_pool.session(), url, self.timeout, raise_for_status=True)
+        return text
     def _guess_name_from_url(self, url:str)->str:
         try:
             host=urlparse(url).netloc; core=(host.split('.')[-2] if len(host.split('.'))>=2 else host)
             return core.replace('-', ' ').replace('_', ' ').title()
         except Exception: return url
     def _extract_players_generic(self, soup:BeautifulSoup)->List[Dict[str,Any]]:
-        players=[]; candidate_tables=soup.find_all("table"); roster_headers=("name","player","pos","position")
-        best_table=None; best_score=0
-        for table in candidate_tables:
-            headers=[th.get_text(strip=True).lower() for th in table.find_all("th")]
-            score=sum(any(h in cell for cell in headers) for h in roster_headers)
-            if score>best_score: best_table, best_score = table, score
-        if best_table and best_score>0:
-            header_cells=[th.get_text(strip=True).lower() for th in best_table.find_all("th")]
-            name_idx=pos_idx=None
-            for i,h in enumerate(header_cells):
-                if name_idx is None and ("name" in h or "player" in h): name_idx=i
-                if pos_idx  is None and ("pos" in h or "position" in h): pos_idx=i
-            for tr in best_table.find_all("tr"):
-                cells=[td.get_text(" ", strip=True) for td in tr.find_all(["td"])]
-                if not cells: continue
-                name=cells[name_idx] if name_idx is not None and name_idx<len(cells) else ""
-                pos =cells[pos_idx]  if pos_idx  is not None and pos_idx <len(cells) else ""
-                if not name or len(name)<2 or "pronunciation" in name.lower(): continue
-                players.append({"name":name,"position":pos,"seasons":[]})
-        if not players:
-            cards=soup.select("[class*='roster'], [class*='player'], [class*='athlete']")
-            for card in cards:
-                text=" ".join(card.stripped_strings)
-                maybe=re.split(r"\s{2,}| \| | - ", text)
-                if maybe and len(maybe[0])>2:
-                    name=maybe[0].strip()
-                    m=re.search(r"\b(G|F|C|GK|MF|FW|DB|RB|LB|WR|QB|TE|DL|OL|S|MB|OH|L|DS)\b", text)
-                    pos=m.group(0) if m else ""
-                    if "powered by" in name.lower(): continue
-                    players.append({"name":name,"position":pos,"seasons":[]})
-        unique, seen = [], set()
-        for p in players:
-            key=(p["name"].lower(), p.get("position"," ").lower())
-            if key not in seen: seen.add(key); unique.append(p)
-        return unique
+        return players_from_soup(soup)
     async def scrape_school(self, identifier:str, sport:Optional[str]=None)->Dict[str,Any]:
         if not identifier: raise ValueError("Missing school identifier or URL")
         if not re.match(r"^https?://", identifier):
             raise ValueError("Expected absolute roster URL")
-        url=identifier; cached=_cache.get(url)
-        if cached: return cached
-        html=await self._get_html(url); soup=BeautifulSoup(html,"html.parser"); players=self._extract_players_generic(soup)
-        result={"name":self._guess_name_from_url(url), "players":players, "source_url":url}
-        _cache.set(url,result); return result
+        url=identifier; t0=time.perf_counter(); cached=await _cache.aget(url)
+        if cached:
+            metrics.record("scrape", time.perf_counter()-t0, {"cache":"hit"}, url=url)
+            return cached
+        try:
+            result=await _scrape_flight.do(url, lambda: self._scrape_uncached(url, sport))
+        except Exception as e:
+            metrics.record("scrape", time.perf_counter()-t0, {"cache":"error"}, url=url, error=type(e).__name__)
+            raise
+        metrics.record("scrape", time.perf_counter()-t0, {"cache":"miss"}, url=url, players=len(result.get("players") or []))
+        return result
+    async def _scrape_uncached(self, url:str, sport:Optional[str]=None)->Dict[str,Any]:
+        html=await self._get_html(url); players=await parse_pool.run_cached(extract_players, html)
+        snap=await asyncio.to_thread(roster_history.record, url, sport, players) if players and roster_history.enabled else None
+        if snap: players=roster_history.annotate(players, snap["seasons"])
+        result={"name":self._guess_name_from_url(url), "players":players, "positions":position_index(players), "source_url":url}
+        if snap: result["features"]=snap["features"]
+        await _cache.aset(url,result); return result
@@ -0,0 +1,221 @@
+
+import os, json, time, zlib, sqlite3, asyncio, threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from scraping.compact import CACHE_COMPACT, pack, unpack, footprint, symbols
+
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "/tmp/phoenix_cache.sqlite3")  # "" disables the disk tier
+CACHE_PURGE_EVERY = int(os.getenv("CACHE_PURGE_EVERY", "200"))
+CACHE_STATS_MAX_ENTRIES = int(os.getenv("CACHE_STATS_MAX_ENTRIES", "1000"))
+
+def connect_sqlite(path:str)->sqlite3.Connection:
+    d=os.path.dirname(path)
+    if d: os.makedirs(d, exist_ok=True)
+    conn=sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+# disk tier shared by every worker on the node (WAL lets readers and one writer overlap)
+class SqliteStore:
+    def __init__(self, path:str):
+        self.path=path; self.error=None; self._conn=None; self._lock=threading.Lock()
+        if not path: return
+        try:
+            conn=connect_sqlite(path)
+            conn.execute("CREATE TABLE IF NOT EXISTS kv (ns TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, ts REAL NOT NULL, size INTEGER NOT NULL, PRIMARY KEY (ns, key))")
+            conn.execute("CREATE INDEX IF NOT EXISTS kv_ns_ts ON kv (ns, ts)")
+            self._conn=conn
+        except Exception as e:
+            self.error=str(e); self._conn=None
+    @property
+    def enabled(self)->bool:
+        return self._conn is not None
+    def _run(self, sql:str, args:tuple=()):
+        if self._conn is None: return []
+        try:
+            with self._lock:
+                return self._conn.execute(sql, args).fetchall()
+        except Exception as e:
+            self.error=str(e); return []
+    def get(self, ns:str, key:str)->Optional[Tuple[bytes,float]]:
+        rows=self._run("SELECT value, ts FROM kv WHERE ns=? AND key=?", (ns, key))
+        return (rows[0][0], rows[0][1]) if rows else None
+    def set(self, ns:str, key:str, blob:bytes, ts:float):
+        # writes finish in whatever order their threads get the lock; an older one never replaces a newer row
+        self._run("INSERT INTO kv (ns, key, value, ts, size) VALUES (?,?,?,?,?) ON CONFLICT (ns, key) DO UPDATE SET "
+                  "value=excluded.value, ts=excluded.ts, size=excluded.size WHERE excluded.ts>=kv.ts", (ns, key, blob, ts, len(blob)))
+    def delete(self, ns:str, key:str):
+        self._run("DELETE FROM kv WHERE ns=? AND key=?", (ns, key))
+    def purge(self, ns:str, older_than:float, max_items:int):
+        self._run("DELETE FROM kv WHERE ns=? AND ts<?", (ns, older_than))
+        if max_items>0:
+            self._run("DELETE FROM kv WHERE ns=? AND key IN (SELECT key FROM kv WHERE ns=? ORDER BY ts DESC LIMIT -1 OFFSET ?)", (ns, ns, max_items))
+    def clear(self, ns:str):
+        self._run("DELETE FROM kv WHERE ns=?", (ns,))
+    # one page of (key, ts, size), newest first, plus how many entries match the filters
+    def entries(self, ns:str, limit:int, offset:int=0, contains:Optional[str]=None,
+                newer_than:Optional[float]=None, older_than:Optional[float]=None)->Tuple[int,list]:
+        where="ns=?"; args:list=[ns]
+        if contains: where+=" AND instr(key, ?)>0"; args.append(contains)
+        if newer_than is not None: where+=" AND ts>=?"; args.append(newer_than)
+        if older_than is not None: where+=" AND ts<=?"; args.append(older_than)
+        total=self._run("SELECT COUNT(*) FROM kv WHERE "+where, tuple(args))
+        rows=self._run("SELECT key, ts, size FROM kv WHERE "+where+" ORDER BY ts DESC LIMIT ? OFFSET ?", tuple(args+[limit, offset]))
+        return (total[0][0] if total else 0), rows
+    def items(self, ns:str):
+        return self._run("SELECT key, value, ts FROM kv WHERE ns=?", (ns,))
+    def stats(self, ns:str)->Dict[str,Any]:
+        rows=self._run("SELECT COUNT(*), COALESCE(SUM(size),0) FROM kv WHERE ns=?", (ns,))
+        out={"enabled":self.enabled, "path":self.path, "size":rows[0][0] if rows else 0, "bytes":rows[0][1] if rows else 0}
+        if self.error: out["error"]=self.error
+        return out
+
+_store=SqliteStore(CACHE_DB_PATH)
+caches:Dict[str,"TieredCache"]={}
+_snapshot=None  # read-only fallback behind both tiers, see scraping/snapshot.py
+
+def attach_snapshot(snapshot):
+    global _snapshot
+    _snapshot=snapshot
+
+# in-process LRU (item + byte bounded) in front of the shared SQLite store, one per namespace
+class TieredCache:
+    def __init__(self, namespace:str, ttl_seconds:float, max_items:int=1024, max_bytes:int=64*1024*1024,
+                 disk_max_items:int=10000, store:Optional[SqliteStore]=None, compact:bool=CACHE_COMPACT):
+        self.namespace=namespace; self.ttl=ttl_seconds; self.max_items=max_items; self.max_bytes=max_bytes; self.compact=compact
+        self.disk_max_items=disk_max_items; self.store=store if store is not None else _store
+        self._mem:"OrderedDict[str,Tuple[Any,float,int]]"=OrderedDict(); self._bytes=0; self._sets=0
+        self._pending:Dict[str,Tuple[Any,float]]={}  # aset values whose disk write has not landed yet
+        self.hits=0; self.disk_hits=0; self.snapshot_hits=0; self.misses=0; self.evictions=0
+        self.retain=ttl_seconds  # grows to the longest TTL a caller has asked for, so purges never cut those entries short
+        caches[namespace]=self
+    def _fresh(self, ts:float, ttl_seconds:Optional[float])->bool:
+        if ttl_seconds is not None and ttl_seconds>self.retain: self.retain=ttl_seconds
+        return (time.time()-ts) < (self.ttl if ttl_seconds is None else ttl_seconds)
+    # memory holds the compact form (see scraping/compact.py); callers always get plain dicts and lists back.
+    # max_bytes bounds what memory actually holds, so packed entries count at their packed size
+    def _put_mem(self, key:str, value:Any, ts:float):
+        old=self._mem.pop(key, None)
+        if old: self._bytes-=old[2]
+        stored=pack(value) if self.compact else value; size=footprint(stored)
+        self._mem[key]=(stored, ts, size); self._bytes+=size
+        while self._mem and (len(self._mem)>self.max_items or self._bytes>self.max_bytes):
+            _, (_, _, sz)=self._mem.popitem(last=False); self._bytes-=sz; self.evictions+=1
+    # stale_snapshot: serve a snapshot row however old it is; the snapshot is only a starting point, so SWR callers
+    # answer from it and refresh in the background instead of treating it as missing
+    def get(self, key:str, ttl_seconds:Optional[float]=None, stale_snapshot:bool=False):
+        hit=self._lookup(key, ttl_seconds, stale_snapshot)
+        return hit[0] if hit else None
+    # value and write time regardless of freshness (within retention, or at any age from the snapshot), for
+    # stale-while-revalidate
+    def get_entry(self, key:str, max_age:Optional[float]=None)->Optional[Tuple[Any,float]]:
+        return self._lookup(key, max(self.ttl, max_age or 0), True)
+    def set(self, key:str, value:Any):
+        ts=time.time(); self._put_mem(key, value, ts); self._sets+=1
+        self._write(key, value, ts, self._sets)
+    # the same for code running on the event loop: memory answers inline, while the disk and snapshot tiers (SQLite
+    # lock waits, zlib, JSON) run in a worker thread
+    async def aget(self, key:str, ttl_seconds:Optional[float]=None, stale_snapshot:bool=False):
+        hit=await self._alookup(key, ttl_seconds, stale_snapshot)
+        return hit[0] if hit else None
+    async def aget_entry(self, key:str, max_age:Optional[float]=None)->Optional[Tuple[Any,float]]:
+        return await self._alookup(key, max(self.ttl, max_age or 0), True)
+    async def aset(self, key:str, value:Any):
+        ts=time.time(); self._put_mem(key, value, ts); self._sets+=1
+        if not self.store.enabled: return
+        self._pending[key]=(value, ts)
+        try:
+            await asyncio.to_thread(self._write, key, value, ts, self._sets)
+        finally:
+            if self._pending.get(key, (None, None))[1]==ts: del self._pending[key]
+    # (value, write time as stored) from whichever tier answered
+    def _lookup(self, key:str, ttl_seconds:Optional[float], stale_snapshot:bool)->Optional[Tuple[Any,float]]:
+        hit=self._mem_hit(key, ttl_seconds)
+        return hit if hit is not None else self._admit(key, self._load(key, ttl_seconds, stale_snapshot))
+    async def _alookup(self, key:str, ttl_seconds:Optional[float], stale_snapshot:bool)->Optional[Tuple[Any,float]]:
+        hit=self._mem_hit(key, ttl_seconds)
+        if hit is not None: return hit
+        hit=self._pending.get(key)  # evicted from memory before its write landed
+        if hit is not None and self._fresh(hit[1], ttl_seconds):
+            self.hits+=1; return hit
+        if not self.store.enabled and _snapshot is None: return self._admit(key, None)
+        return self._admit(key, await asyncio.to_thread(self._load, key, ttl_seconds, stale_snapshot))
+    def _mem_hit(self, key:str, ttl_seconds:Optional[float])->Optional[Tuple[Any,float]]:
+        hit=self._mem.get(key)
+        if hit is None or not self._fresh(hit[1], ttl_seconds): return None
+        self._mem.move_to_end(key); self.hits+=1
+        return (unpack(hit[0]) if self.compact else hit[0]), hit[1]
+    # disk, then snapshot: (tier, value, ts), tier None when the row would not decode. Leaves the memory tier alone,
+    # so it can run off the loop
+    def _load(self, key:str, ttl_seconds:Optional[float], stale_snapshot:bool)->Optional[Tuple[Optional[str],Any,float]]:
+        row=self.store.get(self.namespace, key); tier="disk"
+        if row is None or not self._fresh(row[1], ttl_seconds):
+            row=_snapshot.get(self.namespace, key) if _snapshot is not None else None; tier="snapshot"
+            if row is None or not (self._fresh(row[1], ttl_seconds) or stale_snapshot): return None
+        try:
+            return tier, json.loads(zlib.decompress(row[0])), row[1]
+        except Exception:
+            return None, None, row[1]
+    def _admit(self, key:str, loaded:Optional[Tuple[Optional[str],Any,float]])->Optional[Tuple[Any,float]]:
+        if loaded is None or loaded[0] is None:
+            self.misses+=1; return None
+        tier, value, ts=loaded
+        cur=self._mem.get(key)
+        if cur is not None and cur[1]>=ts:  # written while the read was off the loop; a read-modify-write must see it
+            self.hits+=1; return (unpack(cur[0]) if self.compact else cur[0]), cur[1]
+        self._put_mem(key, value, ts)
+        if tier=="disk": self.disk_hits+=1
+        else: self.snapshot_hits+=1
+        return value, ts
+    def _write(self, key:str, value:Any, ts:float, n:int):
+        raw=json.dumps(value, separators=(",",":")).encode("utf-8")
+        self.store.set(self.namespace, key, zlib.compress(raw), ts)
+        if CACHE_PURGE_EVERY and n % CACHE_PURGE_EVERY == 0:
+            self.store.purge(self.namespace, ts-self.retain, self.disk_max_items)
+    # (key, compressed json, write time) for every retained entry, as stored on disk
+    def items(self)->List[Tuple[str,bytes,float]]:
+        if self.store.enabled: return self.store.items(self.namespace)
+        return [(k, zlib.compress(json.dumps(unpack(v), separators=(",",":")).encode("utf-8")), ts) for k, (v, ts, _) in self._mem.items()]
+    def delete(self, key:str):
+        old=self._mem.pop(key, None)
+        if old: self._bytes-=old[2]
+        self.store.delete(self.namespace, key)
+    def clear(self):
+        self._mem.clear(); self._bytes=0
+        self.store.clear(self.namespace)
+    # entry listing, newest first; key substring and age filters apply before paging
+    def entries(self, limit:int=50, offset:int=0, contains:Optional[str]=None,
+                min_age:Optional[float]=None, max_age:Optional[float]=None)->Dict[str,Any]:
+        now=time.time(); limit=max(0, min(limit, CACHE_STATS_MAX_ENTRIES)); offset=max(0, offset)
+        newer_than=now-max_age if max_age is not None else None; older_than=now-min_age if min_age is not None else None
+        if self.store.enabled:
+            total, rows=self.store.entries(self.namespace, limit, offset, contains, newer_than, older_than)
+        else:
+            rows=[(k, ts, sz) for k, (_, ts, sz) in self._mem.items()
+                  if (not contains or contains in k) and (newer_than is None or ts>=newer_than) and (older_than is None or ts<=older_than)]
+            rows.sort(key=lambda r: -r[1]); total=len(rows); rows=rows[offset:offset+limit]
+        return {"total":total, "offset":offset, "limit":limit,
+                "items":[{"key":k, "age_seconds":round(now-ts, 1), "bytes":sz, "in_memory":k in self._mem} for k, ts, sz in rows]}
+    def stats(self)->Dict[str,Any]:
+        return {
+            "namespace":self.namespace, "ttl_seconds":self.ttl, "retain_seconds":self.retain, "compact":self.compact,
+            "memory":{"size":len(self._mem), "bytes":self._bytes, "max_items":self.max_items, "max_bytes":self.max_bytes,
+                      "hits":self.hits, "misses":self.misses, "evictions":self.evictions},
+            "disk":{**self.store.stats(self.namespace), "hits":self.disk_hits, "max_items":self.disk_max_items},
+            "snapshot_hits":self.snapshot_hits,
+        }
+
+# summary counters for every namespace; entries are only listed when asked for (entries>0), optionally for one namespace
+def cache_stats(namespace:Optional[str]=None, entries:int=0, offset:int=0, contains:Optional[str]=None,
+                min_age:Optional[float]=None, max_age:Optional[float]=None)->Dict[str,Any]:
+    out:Dict[str,Any]={"namespaces":{ns:c.stats() for ns, c in caches.items() if namespace is None or ns==namespace},
+                       "interned_symbols":len(symbols)}
+    if entries>0:
+        for ns, st in out["namespaces"].items():
+            st["entries"]=caches[ns].entries(entries, offset, contains, min_age, max_age)
+    return out
+
+def cache_clear(namespace:Optional[str]=None):
+    for ns, c in caches.items():
+        if namespace is None or ns==namespace: c.clear()
@@ -0,0 +1,82 @@
+
+import os
+from sys import getsizeof
+from array import array
+from typing import Dict, Any, List, Optional
+
+CACHE_COMPACT = os.getenv("CACHE_COMPACT", "1").lower() not in ("0", "false", "no")  # "0" keeps plain dicts in memory
+# only fields with a closed set of values: conference and position are scraped free text and would grow the
+# process-wide symbol table without bound
+ENUM_FIELDS = frozenset(("state", "association", "division", "sport"))
+
+_MISSING = object()
+_SCALARS = (str, int, float, bool, type(None))
+
+# process-wide table for the low-cardinality strings repeated across every cached record; id 0 marks an absent key
+class Symbols:
+    __slots__=("ids","values")
+    def __init__(self):
+        self.ids:Dict[Optional[str],int]={None:1}; self.values:List[Any]=[_MISSING, None]
+    def id(self, value:Optional[str])->int:
+        i=self.ids.get(value)
+        if i is None:
+            i=self.ids[value]=len(self.values); self.values.append(value)
+        return i
+    def __len__(self)->int:
+        return len(self.values)
+
+symbols=Symbols()
+
+# a list of records stored column-wise: enum columns as arrays of symbol ids, scalars and scalar lists (seasons)
+# as tuples, anything else packed recursively; rows are rebuilt as plain dicts only when read
+class Table:
+    __slots__=("n","fields","kinds","columns","sparse","size")
+    def __init__(self, rows:List[Dict[str,Any]]):
+        self.n=len(rows); self.fields=tuple(dict.fromkeys(k for r in rows for k in r)); kinds=[]; columns=[]
+        self.sparse=any(len(r)!=len(self.fields) for r in rows)
+        for f in self.fields:
+            vals=[r.get(f, _MISSING) for r in rows]
+            if f in ENUM_FIELDS and all(v is _MISSING or v is None or isinstance(v, str) for v in vals):
+                kinds.append("e"); columns.append(array("I", [0 if v is _MISSING else symbols.id(v) for v in vals]))
+            elif all(v is _MISSING or isinstance(v, _SCALARS) for v in vals):
+                kinds.append("s"); columns.append(tuple(vals))
+            elif all(isinstance(v, list) and all(isinstance(x, _SCALARS) for x in v) for v in vals):
+                kinds.append("l"); columns.append(tuple(tuple(v) for v in vals))
+            else:
+                kinds.append("v"); columns.append(tuple(v if v is _MISSING else pack(v) for v in vals))
+        self.kinds="".join(kinds); self.columns=tuple(columns)
+        self.size=getsizeof(self)+getsizeof(self.columns)+sum(getsizeof(c) if k=="e" else footprint(c) for k, c in zip(self.kinds, self.columns))
+    def rows(self)->List[Dict[str,Any]]:
+        if not self.fields: return [{} for _ in range(self.n)]
+        cols:List[Any]=[]; values=symbols.values
+        for kind, col in zip(self.kinds, self.columns):
+            if kind=="e": cols.append([values[i] for i in col])
+            elif kind=="s": cols.append(col)
+            elif kind=="l": cols.append([list(v) for v in col])
+            else: cols.append([v if v is _MISSING else unpack(v) for v in col])
+        if not self.sparse:
+            return [dict(zip(self.fields, vals)) for vals in zip(*cols)]
+        return [{f: v for f, v in zip(self.fields, vals) if v is not _MISSING} for vals in zip(*cols)]
+
+def pack(value:Any)->Any:
+    if isinstance(value, dict):
+        return {k: symbols.values[symbols.id(v)] if k in ENUM_FIELDS and isinstance(v, str) else pack(v) for k, v in value.items()}
+    if isinstance(value, list):
+        if value and all(isinstance(x, dict) for x in value): return Table(value)
+        return [pack(x) for x in value]
+    return value
+
+# approximate bytes held by a cached value as stored in memory (packed or plain); dict keys and interned
+# symbols are shared, so they are not counted
+def footprint(value:Any)->int:
+    if isinstance(value, Table): return value.size
+    if isinstance(value, dict): return getsizeof(value)+sum(footprint(v) for v in value.values())
+    if isinstance(value, (list, tuple)): return getsizeof(value)+sum(footprint(v) for v in value)
+    if value is None or value is _MISSING or isinstance(value, bool): return 0
+    return getsizeof(value)
+
+def unpack(value:Any)->Any:
+    if isinstance(value, Table): return value.rows()
+    if isinstance(value, dict): return {k: unpack(v) for k, v in value.items()}
+    if isinstance(value, list): return [unpack(x) for x in value]
+    return value
@@ -1,36 +1,118 @@
 
-import re, os, time
-from typing import Dict, Any, List, Optional, Tuple
-from urllib.parse import urlparse, urljoin
+import re, os, json, time, base64, asyncio
+from typing import Dict, Any, List, Optional, Tuple, Union, Callable
+from urllib.parse import urlparse
 import aiohttp
-from bs4 import BeautifulSoup
 from utils.regions import REGION_STATES, STATE_NAMES, normalize_region
+from scraping.http import http_pool, fetch_text
+from scraping.cache import TieredCache
+from scraping.singleflight import SingleFlight
+from scraping.probes import probe_planner, probe_url
+from scraping.index import program_index, fresh
+from scraping.parsing import parse_pool
+from scraping.scheduler import priority, current_priority, BACKGROUND
+from utils.metrics import metrics, tracing
+from scraping.extract import (
+    extract_state_records, extract_school_wiki_links, extract_athletics_from_school_page, extract_roster_link,
+)
 
 APP_VERSION = os.getenv("APP_VERSION", "3.2.1")
 DEFAULT_DISCOVERY_CACHE_HOURS = float(os.getenv("DISCOVERY_CACHE_HOURS", "24"))
+DISCOVERY_CONCURRENCY = int(os.getenv("DISCOVERY_CONCURRENCY", "16"))
+DISCOVERY_FETCH_TIMEOUT = float(os.getenv("DISCOVERY_FETCH_TIMEOUT", "30"))
+DISCOVERY_STALE_HOURS = float(os.getenv("DISCOVERY_STALE_HOURS", "168"))  # how long past expiry an entry may still be served
+DISCOVERY_CACHE_MAX_ITEMS = int(os.getenv("DISCOVERY_CACHE_MAX_ITEMS", "256"))
+DISCOVERY_CACHE_MAX_BYTES = int(os.getenv("DISCOVERY_CACHE_MAX_MB", "32")) * 1024 * 1024
+CONTINUATION_MAX_AGE_HOURS = float(os.getenv("CONTINUATION_MAX_AGE_HOURS", "24"))
 
-VENDOR_HOST_HINTS = (
-    "sidearmsports.com","prestosports.com","wmt.digital","neulion","athleticsite",
-    "athletics","sports","gohuskies","goeags","go","athletics.","athletics-"
+discovery_cache=TieredCache(
+    "discovery", (DEFAULT_DISCOVERY_CACHE_HOURS+DISCOVERY_STALE_HOURS)*3600.0, max_items=DISCOVERY_CACHE_MAX_ITEMS, max_bytes=DISCOVERY_CACHE_MAX_BYTES
 )
-ROSTER_PATH_HINTS = ("/sports/", "/roster", "/roster.aspx", "/roster?path=", "/team/roster")
+_discover_flight=SingleFlight("discovery")
 
-class _Cache:
+class _Revalidator:
     def __init__(self):
-        self.data = {}
-        self.ts = {}
-    def get(self, key:str, ttl_seconds:float):
-        now=time.time()
-        return self.data.get(key) if (key in self.ts and (now-self.ts[key])<ttl_seconds) else None
-    def set(self, key:str, value:Any):
-        self.data[key]=value; self.ts[key]=time.time()
+        self.tasks=set(); self.active=set(); self.started=0; self.completed=0; self.failed=0; self.last_error=None
+        self.recent:List[Dict[str,Any]]=[]
+    def spawn(self, label:str, factory):
+        if label in self.active: return
+        self.active.add(label); self.started+=1
+        task=asyncio.ensure_future(self._run(label, factory))
+        self.tasks.add(task); task.add_done_callback(self.tasks.discard)
+    async def _run(self, label:str, factory):
+        t0=time.time(); err=None
+        try:
+            with priority(BACKGROUND):
+                await factory()
+            self.completed+=1
+        except Exception as e:
+            err=str(e); self.failed+=1; self.last_error=err
+        finally:
+            self.active.discard(label)
+        self.recent=(self.recent+[{"key":label, "started":t0, "seconds":round(time.time()-t0,3), "error":err}])[-20:]
     def stats(self)->Dict[str,Any]:
-        now=time.time()
-        return {"size":len(self.data), "entries":[{"key":k,"age_seconds":now-self.ts[k]} for k in list(self.data.keys())]}
-    def clear(self): 
-        self.data.clear(); self.ts.clear()
+        return {"in_progress":len(self.tasks), "started":self.started, "completed":self.completed,
+                "failed":self.failed, "last_error":self.last_error, "recent":self.recent}
+
+revalidator=_Revalidator()
+
+# lets callers watch a crawl (their own or one they coalesced onto) program by program
+class _Progress:
+    def __init__(self):
+        self.subs:Dict[str,List[Callable]]={}; self.status:Dict[str,Dict[str,int]]={}
+        self.found:Dict[str,List[Tuple[str,Dict[str,Any]]]]={}
+    def start(self, key:str, states:int)->Dict[str,int]:
+        self.found[key]=[]
+        st=self.status[key]={"states":states, "schools":0, "schools_done":0}
+        return st
+    def finish(self, key:str):
+        self.status.pop(key, None); self.found.pop(key, None)
+    # callers coalescing onto a running crawl first get what it has found so far
+    def subscribe(self, key:str, cb:Callable):
+        for sport, program in list(self.found.get(key, ())):
+            try: cb(sport, program)
+            except Exception: pass
+        self.subs.setdefault(key, []).append(cb)
+    def unsubscribe(self, key:str, cb:Callable):
+        cbs=self.subs.get(key, [])
+        if cb in cbs: cbs.remove(cb)
+        if not cbs: self.subs.pop(key, None)
+    def publish(self, key:str, sport:str, program:Dict[str,Any]):
+        if key in self.found: self.found[key].append((sport, program))
+        for cb in list(self.subs.get(key, ())):
+            try: cb(sport, program)
+            except Exception: pass
+
+_progress=_Progress()
+
+# a continuation token is the query plus when its crawl started: index entries written since then are the
+# checkpoint, so a resumed crawl treats them as fresh and only works on the states/schools not yet done. The
+# checkpoint lives in this instance's cache database; elsewhere the token only carries the query
+def encode_continuation(sports:List[str], states:List[str], srcs:List[str], include_diii:bool, include_njcaa:bool, since:float)->str:
+    body={"v":1, "sports":sports, "states":states, "sources":srcs, "diii":include_diii, "njcaa":include_njcaa, "since":since}
+    return base64.urlsafe_b64encode(json.dumps(body, separators=(",",":")).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_continuation(token:str)->Dict[str,Any]:
+    try:
+        body=json.loads(base64.urlsafe_b64decode(token+"="*(-len(token) % 4)))
+        ok=isinstance(body, dict) and body.get("v")==1 and bool(body.get("sports")) and bool(body.get("states"))
+        since=float(body["since"]) if ok else None
+    except Exception:
+        ok=False
+    if not ok: raise ValueError("Invalid continuation token")
+    if not 0 <= time.time()-since < CONTINUATION_MAX_AGE_HOURS*3600.0:
+        raise ValueError("Continuation token expired; start the crawl again")
+    return body
+_state_flight=SingleFlight("index_states")
+_school_flight=SingleFlight("index_schools")
 
-discovery_cache=_Cache()
+# results keep input order; at most `limit` factories are awaited at once
+async def _gather_bounded(factories, limit:int)->List[Any]:
+    sem=asyncio.Semaphore(max(1,limit))
+    async def run(f):
+        async with sem:
+            return await f()
+    return await asyncio.gather(*(run(f) for f in factories))
 
 def _sport_slugs(sport:str)->List[str]:
     SPORT_SLUGS = {
@@ -49,145 +131,88 @@ def _sport_slugs(sport:str)->List[str]:
 
 async def _fetch(session:aiohttp.ClientSession, url:str)->Tuple[int,str]:
     try:
-        async with session.get(url) as resp:
-            return resp.status, await resp.text()
+        return await fetch_text(session, url, DISCOVERY_FETCH_TIMEOUT)
     except Exception:
         return 0, ""
 
-def _score_url_for_athletics(url:str)->int:
-    u=urlparse(url)
-    host=(u.netloc or "").lower()
-    path=(u.path or "").lower()
-    score=0
-    if "wikipedia.org" in host: return -999
-    if "athletic" in host or "athletic" in path or "sports" in host or "sports" in path: score+=5
-    if any(v in host for v in VENDOR_HOST_HINTS): score+=4
-    if any(h in path for h in ROSTER_PATH_HINTS): score+=3
-    if host.endswith(".edu"): score+=1
-    return score
-
-def _best_external_link(el)->Optional[str]:
-    candidates = []
-    for a in el.find_all("a", href=True):
-        href=a["href"]
-        if not (href.startswith("http") or href.startswith("/wiki/")): 
-            continue
-        url = href if href.startswith("http") else ("https://en.wikipedia.org"+href)
-        score=_score_url_for_athletics(url)
-        if score>0:
-            candidates.append((score, url))
-    if not candidates:
-        return None
-    candidates.sort(reverse=True)
-    return candidates[0][1]
-
-async def _find_roster_link_on_page(session, page_url):
-    status, html = await _fetch(session, page_url)
-    if status != 200 or not html: return None
-    soup = BeautifulSoup(html, "html.parser")
-    for a in soup.find_all("a", href=True):
-        text=" ".join(a.get_text(" ", strip=True).split()).lower()
-        if "roster" in text:
-            return urljoin(page_url, a["href"])
-    return None
+# a fetch that says nothing about the page (network error, open circuit, throttling, server error); resolution
+# stops and the index keeps what it had instead of recording "not found" with a fresh timestamp
+class FetchFailed(Exception):
+    pass
+
+def _failed(status:int)->bool:
+    return status == 0 or status == 429 or status >= 500
 
-async def _try_roster(session, base_url, slug):
+async def _try_roster(session, base_url, slug, pages=None):
     base = base_url.rstrip("/")
-    probes = [
-        f"{base}/sports/{slug}/roster",
-        f"{base}/{slug}/roster",
-        f"{base}/roster.aspx?path={slug}",
-        f"{base}/sports/{slug}",
-        f"{base}/{slug}",
-    ]
-    for cand in probes:
-        status2, html2 = await _fetch(session, cand)
-        if status2 == 200 and ("/roster" in cand.lower() or (html2 and "roster" in html2.lower())):
-            return cand
-    for sport_page in [f"{base}/sports/{slug}", f"{base}/{slug}"]:
-        roster = await _find_roster_link_on_page(session, sport_page)
-        if roster: return roster
-    roster = await _find_roster_link_on_page(session, base)
-    return roster
-
-async def _enum_from_wikipedia(session, states:List[str])->List[Dict[str,Any]]:
-    base="https://en.wikipedia.org/wiki/List_of_college_athletic_programs_in_{}"
-    out=[]
-    for st in states:
-        url=base.format(STATE_NAMES[st].replace(' ','_'))
-        status, html = await _fetch(session, url)
-        if status != 200 or not html: 
-            continue
-        soup=BeautifulSoup(html,"html.parser")
-        tables=soup.find_all("table", class_=lambda x: x and "wikitable" in x)
-        for table in tables:
-            rows = table.find_all("tr")
-            for tr in rows[1:]:
-                tds=tr.find_all("td")
-                if not tds: continue
-                name_cell=tds[0]
-                assoc_text=" ".join(td.get_text(" ", strip=True) for td in tds[1:3]) if len(tds)>=3 else tr.get_text(" ", strip=True)
-                assoc,division="",""
-                if re.search(r"NJCAA", assoc_text, re.I): assoc="NJCAA"
-                elif re.search(r"NAIA", assoc_text, re.I): assoc="NAIA"
-                elif re.search(r"NCAA", assoc_text, re.I):
-                    assoc="NCAA"; m=re.search(r"Division\s+(I|II|III)", assoc_text, re.I)
-                    if m: division=f"Division {m.group(1).upper()}"
-                athletics=_best_external_link(name_cell) or _best_external_link(tr)
-                school_wiki=None
-                a=name_cell.find("a", href=True)
-                if a:
-                    href=a["href"]
-                    if href.startswith("http") or href.startswith("/wiki/"):
-                        school_wiki = href if href.startswith("http") else ("https://en.wikipedia.org"+href)
-                out.append({
-                    "school": name_cell.get_text(" ", strip=True),
-                    "state": st, "association": assoc or None, "division": division or None,
-                    "athletics_url": athletics, "school_wiki": school_wiki
-                })
-    return out
+    host = (urlparse(base).netloc or "").lower()
+    pages = {} if pages is None else pages
+    failed = False
+    # pages holds real fetches only, shared by every template probing the same URL; a negative-cache skip is per kind
+    async def get(url, kind):
+        if url not in pages:
+            if await probe_planner.is_negative(url, kind):
+                return 404, ""
+            probe_planner.probes += 1
+            pages[url] = await _fetch(session, url)
+        return pages[url]
+    for attempt, name in enumerate(await probe_planner.plan(host)):
+        kind, cand = probe_url(name, base, slug)
+        t0 = time.perf_counter()
+        status, html = await get(cand, kind)
+        failed = failed or _failed(status)
+        found = None
+        if status == 200 and kind == "direct":
+            if "/roster" in cand.lower() or (html and "roster" in html.lower()):
+                found = cand
+        elif status == 200 and html:
+            found = await parse_pool.run_cached(extract_roster_link, html, cand)
+        metrics.inc("probe_attempts_total", template=name, outcome="hit" if found else "miss")
+        metrics.record("probe", time.perf_counter()-t0, {"template":name}, url=cand, status=status, found=bool(found))
+        if found:
+            await probe_planner.record(host, name, attempt, html)
+            return found
+        await probe_planner.mark_negative(cand, status, kind)
+    if failed:
+        raise FetchFailed(base)
+    return None
+
+async def _enum_state_from_wikipedia(session, st:str)->List[Dict[str,Any]]:
+    url="https://en.wikipedia.org/wiki/List_of_college_athletic_programs_in_{}".format(STATE_NAMES[st].replace(' ','_'))
+    status, html = await _fetch(session, url)
+    if _failed(status):
+        raise FetchFailed(url)
+    if status != 200 or not html: 
+        return []
+    return await parse_pool.run_cached(extract_state_records, html, st)
+
+async def _index_state(session, st:str, max_age:float, counters:Dict[str,int])->List[Dict[str,Any]]:
+    recs=await program_index.get_state(st, max_age)
+    if recs is None:
+        try:
+            recs=await _state_flight.do("{}:{}".format(current_priority(), st), lambda: _enum_state_from_wikipedia(session, st))
+        except FetchFailed:
+            counters["fetch_failures"]+=1
+            return await program_index.get_state(st, float("inf")) or []  # keep serving the last good list
+        counters["states_refreshed"]+=1
+        if recs: await program_index.put_state(st, recs)
+    return recs
+
+async def _enum_from_wikipedia(session, states:List[str], max_age:float, counters:Dict[str,int])->List[Dict[str,Any]]:
+    per_state = await asyncio.gather(*(_index_state(session, st, max_age, counters) for st in states))
+    return [rec for recs in per_state for rec in recs]
 
 async def _resolve_athletics_from_school_page(session, school_page_url:str)->Optional[str]:
     status, html = await _fetch(session, school_page_url)
+    if _failed(status): raise FetchFailed(school_page_url)
     if status != 200 or not html: return None
-    soup = BeautifulSoup(html, "html.parser")
-    candidates=[]
-    for a in soup.find_all("a", href=True):
-        text=" ".join(a.get_text(" ", strip=True).split()).lower()
-        href=a["href"]
-        abs_url = urljoin(school_page_url, href)
-        score=_score_url_for_athletics(abs_url)
-        if ("athletic" in text or "athletics" in text or "sports" in text or score>=5):
-            candidates.append((score, abs_url))
-    if not candidates: return None
-    candidates.sort(reverse=True)
-    return candidates[0][1]
+    return await parse_pool.run_cached(extract_athletics_from_school_page, html, school_page_url)
 
 async def _resolve_school_wiki_to_links(session, school_wiki_url:str)->Tuple[Optional[str], Optional[str]]:
     status, html = await _fetch(session, school_wiki_url)
+    if _failed(status): raise FetchFailed(school_wiki_url)
     if status != 200 or not html: return None, None
-    soup = BeautifulSoup(html, "html.parser")
-    links=[]
-    box = soup.find("table", class_=lambda x: x and "infobox" in x)
-    if box:
-        links.extend([a["href"] for a in box.find_all("a", href=True)])
-    links.extend([a["href"] for a in soup.find_all("a", href=True)])
-    clean=[]
-    for href in links:
-        if href.startswith("/wiki/") or href.startswith("http"):
-            url = href if href.startswith("http") else ("https://en.wikipedia.org"+href)
-            if "wikipedia.org" in url: 
-                continue
-            clean.append(url)
-    if not clean: return None, None
-    best_ath=None; best_site=None; best_score=-999
-    for url in clean:
-        score=_score_url_for_athletics(url)
-        if score>best_score:
-            best_score=score; best_ath=url
-        if (best_site is None) or urlparse(url).netloc.endswith(".edu"):
-            best_site=url
-    return best_ath, best_site
+    return await parse_pool.run_cached(extract_school_wiki_links, html)
 
 async def _pipeline_resolve_athletics(session, rec:Dict[str,Any])->Optional[str]:
     if rec.get("athletics_url"):
@@ -202,10 +227,15 @@ async def _pipeline_resolve_athletics(session, rec:Dict[str,Any])->Optional[str]
                 return ath2
     return None
 
-async def _maybe_roster_url(session, athletics_url:str, slugs:List[str])->Optional[str]:
+async def _maybe_roster_url(session, athletics_url:str, slugs:List[str], pages=None)->Optional[str]:
+    failed = None
     for slug in slugs:
-        ru = await _try_roster(session, athletics_url, slug)
+        try:
+            ru = await _try_roster(session, athletics_url, slug, pages)
+        except FetchFailed as e:
+            failed = e; continue
         if ru: return ru
+    if failed: raise failed
     return None
 
 def _filter_association(rec:Dict[str,Any], include_diii:bool, include_njcaa:bool)->bool:
@@ -217,60 +247,222 @@ def _filter_association(rec:Dict[str,Any], include_diii:bool, include_njcaa:bool
         return False
     return True
 
-async def _enum_programs(session, states:List[str], sources:List[str])->List[Dict[str,Any]]:
+async def _enum_programs(session, states:List[str], sources:List[str], max_age:float, counters:Dict[str,int])->List[Dict[str,Any]]:
     records=[]
     if "governing" in sources or "wiki" in sources:
-        records.extend(await _enum_from_wikipedia(session, states))
+        records.extend(await _enum_from_wikipedia(session, states, max_age, counters))
     return records
 
-async def discover_programs(
-    sport:str, region:Optional[str]=None, states:Optional[List[str]]=None, sources:str="governing,vendors,wiki",
-    include_diii:bool=False, include_njcaa:bool=False, cache_hours:Optional[float]=None, diag:bool=False
-)->Dict[str,Any]:
-    slugs=_sport_slugs(sport)
+def _resolve_states(region:Optional[str], states:Optional[List[str]])->List[str]:
     if states: 
-        states=[s.strip().upper() for s in states if s.strip()]
-    else:
-        r=normalize_region(region) if region else ""
-        if not r: raise ValueError("Provide a valid region or states list")
-        states=REGION_STATES[r]
-    srcs=[s.strip().lower() for s in sources.split(",") if s.strip()]
-    key="{}::disc::{}::{}::diii={}::njcaa={}::src={}".format(
+        return [s.strip().upper() for s in states if s.strip()]
+    r=normalize_region(region) if region else ""
+    if not r: raise ValueError("Provide a valid region or states list")
+    return REGION_STATES[r]
+
+def _discovery_key(states:List[str], slugs:List[str], include_diii:bool, include_njcaa:bool, srcs:List[str])->str:
+    return "{}::disc::{}::{}::diii={}::njcaa={}::src={}".format(
         APP_VERSION, ",".join(states), ",".join(slugs), include_diii, include_njcaa, ",".join(sorted(srcs))
     )
+
+async def discover_programs(
+    sport:Union[str,List[str],None]=None, region:Optional[str]=None, states:Optional[List[str]]=None, sources:str="governing,vendors,wiki",
+    include_diii:bool=False, include_njcaa:bool=False, cache_hours:Optional[float]=None, diag:bool=False,
+    index_hours:Optional[float]=None, on_program:Optional[Callable[[str,Dict[str,Any]],None]]=None,
+    budget_ms:Optional[float]=None, continuation:Optional[str]=None
+)->Dict[str,Any]:
+    t0=time.perf_counter(); since=None
+    if continuation:
+        tok=decode_continuation(continuation); since=tok["since"]
+        sport=tok["sports"][0] if len(tok["sports"])==1 else tok["sports"]; states=tok["states"]; region=None
+        sources=",".join(tok["sources"]); include_diii=bool(tok["diii"]); include_njcaa=bool(tok["njcaa"])
+    deadline=time.monotonic()+budget_ms/1000.0 if budget_ms else None
+    with tracing(diag) as trace:
+        res, cache = await _discover_programs(
+            sport, region, states, sources, include_diii, include_njcaa, cache_hours, index_hours, on_program, deadline, since
+        )
+        metrics.record("discover", time.perf_counter()-t0, {"cache":cache}, count=res.get("count"))
+    if diag and trace is not None: res["diag"]=trace.summary()
+    return res
+
+async def _discover_programs(
+    sport:Union[str,List[str]], region:Optional[str], states:Optional[List[str]], sources:str,
+    include_diii:bool, include_njcaa:bool, cache_hours:Optional[float], index_hours:Optional[float],
+    on_program:Optional[Callable[[str,Dict[str,Any]],None]], deadline:Optional[float]=None, since:Optional[float]=None
+)->Tuple[Dict[str,Any],str]:
+    sports=[sport] if isinstance(sport, str) or sport is None else list(dict.fromkeys(sport))
+    states=_resolve_states(region, states)
+    srcs=[s.strip().lower() for s in sources.split(",") if s.strip()]
     ttl=(cache_hours if cache_hours is not None else DEFAULT_DISCOVERY_CACHE_HOURS)*3600.0
-    cached=discovery_cache.get(key, ttl)
-    if cached is not None:
-        return {"count": len(cached['programs']), "from_cache": True, **cached}
-    headers={"User-Agent":"Mozilla/5.0","Accept":"text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"}
-    conn=aiohttp.TCPConnector(ssl=False, limit=10)
-    programs=[]; diag_fetch=[]
-    async with aiohttp.ClientSession(connector=conn, timeout=aiohttp.ClientTimeout(total=30), headers=headers) as session:
-        records = await _enum_programs(session, states, srcs)
-        for rec in records:
-            if not _filter_association(rec, include_diii, include_njcaa): 
-                continue
-            athletics = await _pipeline_resolve_athletics(session, rec)
-            if not athletics:
-                continue
-            roster_url = await _maybe_roster_url(session, athletics, slugs)
-            if not roster_url:
-                continue
-            programs.append({
-                "school": rec["school"], "state": rec["state"],
-                "association": rec.get("association"), "division": rec.get("division"),
-                "athletics_url": athletics, "roster_url": roster_url
-            })
-    payload={"programs":programs,"states":states,"sport_slugs":slugs,"sources_used":srcs,"diag":diag_fetch if diag else None}
-    if programs: discovery_cache.set(key,payload)
-    return {"count":len(programs),"from_cache":False, **payload}
+    max_age=index_hours*3600.0 if index_hours is not None else ttl
+    if since is not None: max_age=max(max_age, time.time()-since+1.0)  # resuming: whatever this crawl already did counts
+    out:Dict[str,Dict[str,Any]]={}; missing:Dict[str,List[str]]={}; stale:Dict[str,List[str]]={}; keys:Dict[str,str]={}
+    for sp in sports:
+        slugs=_sport_slugs(sp)
+        keys[sp]=_discovery_key(states, slugs, include_diii, include_njcaa, srcs)
+        hit=await discovery_cache.aget_entry(keys[sp], ttl+DISCOVERY_STALE_HOURS*3600.0) if ttl>0 else None
+        if hit is not None and time.time()-hit[1] < ttl:
+            out[sp]={"count": len(hit[0]['programs']), "from_cache": True, **hit[0]}
+        elif hit is not None:
+            # stale-while-revalidate: answer now, refresh in the background
+            out[sp]={"count": len(hit[0]['programs']), "from_cache": True, "stale": True, **hit[0]}
+            stale[sp]=slugs
+        else:
+            missing[sp]=slugs
+    def crawl(todo:Dict[str,List[str]]):
+        # a shared crawl fetches at its starter's priority, so interactive callers never wait behind a background one
+        flight_key="{}:{}".format(current_priority(), "|".join(keys[sp] for sp in todo))
+        return _discover_flight.do(flight_key, lambda: _discover_uncached(
+            {sp: keys[sp] for sp in todo}, states, todo, srcs, include_diii, include_njcaa, max_age
+        ))
+    if stale:
+        revalidator.spawn("|".join(keys[sp] for sp in stale), lambda: crawl(stale))
+    token=None
+    if missing:
+        progress_key="|".join(keys[sp] for sp in missing)
+        started=since or time.time(); found:Dict[str,List[Dict[str,Any]]]={sp:[] for sp in missing}
+        def collect(sp, program):
+            found[sp].append(program)
+            if on_program: on_program(sp, program)
+        _progress.subscribe(progress_key, collect)
+        try:
+            # the crawl is shared and shielded, so on timeout it keeps running (and checkpointing) for whoever resumes
+            res = await (crawl(missing) if deadline is None else asyncio.wait_for(crawl(missing), max(0.0, deadline-time.monotonic())))
+        except asyncio.TimeoutError:
+            res = None
+        finally:
+            _progress.unsubscribe(progress_key, collect)
+        if res is not None:
+            for sp in missing: out[sp]=dict(res[sp])
+        else:
+            token=encode_continuation(sports, states, srcs, include_diii, include_njcaa, started)
+            status=dict(_progress.status.get(progress_key) or {})
+            for sp, slugs in missing.items():
+                out[sp]={"count":len(found[sp]), "from_cache":False, "programs":found[sp], "states":states, "sport_slugs":slugs,
+                         "sources_used":srcs, "diag":None, "partial":True, "progress":status}
+    cache=("partial" if token else "miss") if missing else ("stale" if stale else "hit")
+    if isinstance(sport, str) or sport is None:
+        res=out[sport]
+    else:
+        res={"count": sum(r["count"] for r in out.values()), "states": states, "sources_used": srcs, "sports": out}
+    if token: res={**res, "partial":True, "continuation":token}
+    return res, cache
+
+# one crawl for every requested sport: each athletics site is resolved once and its fetched pages are shared across sports
+async def _discover_uncached(
+    keys:Dict[str,str], states:List[str], slugs_by_sport:Dict[str,List[str]], srcs:List[str],
+    include_diii:bool, include_njcaa:bool, max_age:float
+)->Dict[str,Dict[str,Any]]:
+    progress_key="|".join(keys.values())
+    session=http_pool.session()
+    counters={"states_refreshed":0, "schools_refreshed":0, "rosters_probed":0, "fetch_failures":0}
+    status=_progress.start(progress_key, len(states))
+    try:
+        return await _crawl(keys, states, slugs_by_sport, srcs, include_diii, include_njcaa, max_age, session, counters, status)
+    finally:
+        _progress.finish(progress_key)
+
+async def _crawl(
+    keys:Dict[str,str], states:List[str], slugs_by_sport:Dict[str,List[str]], srcs:List[str], include_diii:bool,
+    include_njcaa:bool, max_age:float, session, counters:Dict[str,int], status:Dict[str,int]
+)->Dict[str,Dict[str,Any]]:
+    progress_key="|".join(keys.values())
+    records = await _enum_programs(session, states, srcs, max_age, counters)
+    # every write re-reads the entry and merges one change into it: crawls for other sports update the same
+    # school concurrently, and a write-back of an older copy would drop their rosters
+    async def merge_school(key, rec, change):
+        entry=await program_index.get_school(key)
+        entry.update({"school": rec["school"], "state": rec["state"], "association": rec.get("association"),
+                      "division": rec.get("division"), "school_wiki": rec.get("school_wiki")})
+        change(entry); await program_index.put_school(key, entry)
+        return entry
+    # shared per school whatever the sports asked for
+    async def refresh_athletics(key, rec):
+        entry=await program_index.get_school(key)
+        if fresh(entry.get("athletics_ts"), max_age): return entry
+        with metrics.timed("resolve") as span:
+            try:
+                athletics = await _pipeline_resolve_athletics(session, rec); ok = True
+            except FetchFailed:
+                athletics = entry.get("athletics_url"); ok = False
+            span.update(school=rec["school"], found=bool(athletics), failed=not ok)
+        if not ok:
+            counters["fetch_failures"]+=1; return entry
+        counters["schools_refreshed"]+=1
+        def change(entry):
+            if athletics != entry.get("athletics_url"): entry["rosters"]={}
+            entry["athletics_url"]=athletics; entry["athletics_ts"]=time.time()
+        return await merge_school(key, rec, change)
+    # shared per school and sport; pages are this crawl's fetches, reused across its sports
+    async def refresh_roster(key, rec, athletics, slugs, pages):
+        sk=",".join(slugs)
+        try:
+            roster_url = await _maybe_roster_url(session, athletics, slugs, pages)
+        except FetchFailed:
+            counters["fetch_failures"]+=1; return None  # the previous roster URL, if any, stays in use
+        counters["rosters_probed"]+=1
+        def change(entry):
+            if entry.get("athletics_url")==athletics: entry["rosters"][sk]={"url": roster_url, "ts": time.time()}
+        return await merge_school(key, rec, change)
+    async def refresh_school(key, rec):
+        prio=current_priority()
+        entry = await _school_flight.do("{}:{}".format(prio, key), lambda: refresh_athletics(key, rec))
+        athletics=entry.get("athletics_url"); pages={}
+        for slugs in (slugs_by_sport.values() if athletics else ()):
+            sk=",".join(slugs); known=entry["rosters"].get(sk)
+            if known is None or not fresh(known.get("ts"), max_age):
+                await _school_flight.do("{}:{}::{}".format(prio, key, sk), lambda slugs=slugs: refresh_roster(key, rec, athletics, slugs, pages))
+        return await program_index.get_school(key) if athletics else entry
+    async def resolve(rec):
+        key=program_index.school_key(rec)
+        entry = await refresh_school(key, rec)
+        athletics=entry.get("athletics_url")
+        if not athletics:
+            return {}
+        found={}
+        for sp, slugs in slugs_by_sport.items():
+            roster_url=(entry["rosters"].get(",".join(slugs)) or {}).get("url")
+            if roster_url:
+                found[sp]={
+                    "school": rec["school"], "state": rec["state"],
+                    "association": rec.get("association"), "division": rec.get("division"),
+                    "athletics_url": athletics, "roster_url": roster_url
+                }
+                _progress.publish(progress_key, sp, found[sp])
+        return found
+    async def resolve_counted(rec):
+        try:
+            return await resolve(rec)
+        finally:
+            status["schools_done"]+=1
+    wanted=[rec for rec in records if _filter_association(rec, include_diii, include_njcaa)]
+    status["schools"]=len(wanted)
+    resolved = await _gather_bounded([(lambda rec=rec: resolve_counted(rec)) for rec in wanted], DISCOVERY_CONCURRENCY)
+    out={}
+    for sp, slugs in slugs_by_sport.items():
+        programs=[r[sp] for r in resolved if sp in r]
+        payload={"programs":programs,"states":states,"sport_slugs":slugs,"sources_used":srcs,"diag":None}
+        # a crawl that lost fetches may be missing schools; the index holds its progress, the query cache waits for a clean run
+        if programs and not counters["fetch_failures"]: await discovery_cache.aset(keys[sp],payload)
+        out[sp]={"count":len(programs),"from_cache":False, **payload, "index":counters}
+    return out
+
+# cancelled crawls stop cleanly; left running into a closed HTTP pool they would only log a failure per school
+async def stop_crawls():
+    for t in list(revalidator.tasks): t.cancel()
+    for flight in (_discover_flight, _school_flight, _state_flight): await flight.cancel_all()
 
 async def rebuild_index(
-    sport:str, region:Optional[str]=None, states:Optional[List[str]]=None, sources:str="governing,vendors,wiki",
-    include_diii:bool=False, include_njcaa:bool=False, cache_hours:Optional[float]=None, diag:bool=False
+    sport:Union[str,List[str],None]=None, region:Optional[str]=None, states:Optional[List[str]]=None, sources:str="governing,vendors,wiki",
+    include_diii:bool=False, include_njcaa:bool=False, cache_hours:Optional[float]=None, diag:bool=False,
+    force:bool=False, budget_ms:Optional[float]=None, continuation:Optional[str]=None
 )->Dict[str,Any]:
-    res = await discover_programs(
-        sport=sport, region=region, states=states, sources=sources,
-        include_diii=include_diii, include_njcaa=include_njcaa, cache_hours=0, diag=diag
-    )
+    # the query cache is always bypassed; index entries are only recrawled when older than cache_hours (or force)
+    index_hours = 0 if force else (cache_hours if cache_hours is not None else DEFAULT_DISCOVERY_CACHE_HOURS)
+    with priority(BACKGROUND):
+        res = await discover_programs(
+            sport=sport, region=region, states=states, sources=sources,
+            include_diii=include_diii, include_njcaa=include_njcaa, cache_hours=0, diag=diag, index_hours=index_hours,
+            budget_ms=budget_ms, continuation=continuation
+        )
     return res
@@ -0,0 +1,291 @@
+
+import re, os
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse, urljoin
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html, lxml.etree
+    _HAS_LXML = True
+except Exception:
+    _HAS_LXML = False
+
+# Pure html -> plain-data extractors. They run inside the parse pool (possibly another process), so they take
+# and return only picklable values and never touch the event loop.
+# HTML_BACKEND=lxml walks a native lxml tree (default when lxml is installed); bs4 is the reference
+# BeautifulSoup/html.parser implementation, restricted with SoupStrainers to the tags each extractor reads.
+HTML_BACKEND = os.getenv("HTML_BACKEND", "lxml" if _HAS_LXML else "bs4").strip().lower()
+if HTML_BACKEND == "lxml" and not _HAS_LXML: HTML_BACKEND = "bs4"
+
+VENDOR_HOST_HINTS = (
+    "sidearmsports.com","prestosports.com","wmt.digital","neulion","athleticsite",
+    "athletics","sports","gohuskies","goeags","go","athletics.","athletics-"
+)
+ROSTER_PATH_HINTS = ("/sports/", "/roster", "/roster.aspx", "/roster?path=", "/team/roster")
+
+def _score_url_for_athletics(url:str)->int:
+    u=urlparse(url)
+    host=(u.netloc or "").lower()
+    path=(u.path or "").lower()
+    score=0
+    if "wikipedia.org" in host: return -999
+    if "athletic" in host or "athletic" in path or "sports" in host or "sports" in path: score+=5
+    if any(v in host for v in VENDOR_HOST_HINTS): score+=4
+    if any(h in path for h in ROSTER_PATH_HINTS): score+=3
+    if host.endswith(".edu"): score+=1
+    return score
+
+def _best_external_link(el)->Optional[str]:
+    return _pick_best_link(a["href"] for a in el.find_all("a", href=True))
+
+_ANCHORS = SoupStrainer("a", href=True)
+_WIKITABLES = SoupStrainer("table", class_=lambda x: x and "wikitable" in x)
+_INFOBOX_AND_ANCHORS = SoupStrainer(lambda name, attrs: (name == "a" and "href" in attrs) or (name == "table" and "infobox" in _class_str(attrs.get("class"))))
+_CARD_SELECTOR = "[class*='roster'], [class*='player'], [class*='athlete']"
+_CARD_POSITION = re.compile(r"\b(G|F|C|GK|MF|FW|DB|RB|LB|WR|QB|TE|DL|OL|S|MB|OH|L|DS)\b")
+_CARD_SPLIT = re.compile(r"\s{2,}| \| | - ")
+_NJCAA = re.compile(r"NJCAA", re.I); _NAIA = re.compile(r"NAIA", re.I); _NCAA = re.compile(r"NCAA", re.I)
+_DIVISION = re.compile(r"Division\s+(I|II|III)", re.I)
+
+def _class_str(value)->str:
+    return " ".join(value) if isinstance(value, (list, tuple)) else (value or "")
+
+def _wiki_url(href:str)->Optional[str]:
+    if href.startswith("http") or href.startswith("/wiki/"):
+        return href if href.startswith("http") else ("https://en.wikipedia.org"+href)
+    return None
+
+def _pick_best_link(hrefs)->Optional[str]:
+    candidates = []
+    for href in hrefs:
+        url = _wiki_url(href)
+        if not url: 
+            continue
+        score=_score_url_for_athletics(url)
+        if score>0:
+            candidates.append((score, url))
+    if not candidates:
+        return None
+    candidates.sort(reverse=True)
+    return candidates[0][1]
+
+def _classify_association(assoc_text:str)->Tuple[Optional[str],Optional[str]]:
+    assoc,division="",""
+    if _NJCAA.search(assoc_text): assoc="NJCAA"
+    elif _NAIA.search(assoc_text): assoc="NAIA"
+    elif _NCAA.search(assoc_text):
+        assoc="NCAA"; m=_DIVISION.search(assoc_text)
+        if m: division=f"Division {m.group(1).upper()}"
+    return assoc or None, division or None
+
+def _pick_athletics_anchor(anchors, page_url:str)->Optional[str]:
+    candidates=[]
+    for text, href in anchors:
+        text=" ".join(text.split()).lower()
+        abs_url = urljoin(page_url, href)
+        score=_score_url_for_athletics(abs_url)
+        if ("athletic" in text or "athletics" in text or "sports" in text or score>=5):
+            candidates.append((score, abs_url))
+    if not candidates: return None
+    candidates.sort(reverse=True)
+    return candidates[0][1]
+
+def _players_from_rows(header_cells:List[str], rows:List[List[str]])->List[Dict[str,Any]]:
+    players=[]
+    name_idx=pos_idx=None
+    for i,h in enumerate(header_cells):
+        if name_idx is None and ("name" in h or "player" in h): name_idx=i
+        if pos_idx  is None and ("pos" in h or "position" in h): pos_idx=i
+    for cells in rows:
+        if not cells: continue
+        name=cells[name_idx] if name_idx is not None and name_idx<len(cells) else ""
+        pos =cells[pos_idx]  if pos_idx  is not None and pos_idx <len(cells) else ""
+        if not name or len(name)<2 or "pronunciation" in name.lower(): continue
+        players.append({"name":name,"position":pos,"seasons":[]})
+    return players
+
+def _players_from_cards(texts)->List[Dict[str,Any]]:
+    players=[]
+    for text in texts:
+        maybe=_CARD_SPLIT.split(text)
+        if maybe and len(maybe[0])>2:
+            name=maybe[0].strip()
+            m=_CARD_POSITION.search(text)
+            pos=m.group(0) if m else ""
+            if "powered by" in name.lower(): continue
+            players.append({"name":name,"position":pos,"seasons":[]})
+    return players
+
+def _dedupe_players(players:List[Dict[str,Any]])->List[Dict[str,Any]]:
+    unique, seen = [], set()
+    for p in players:
+        key=(p["name"].lower(), p.get("position"," ").lower())
+        if key not in seen: seen.add(key); unique.append(p)
+    return unique
+
+def _pick_school_links(links:List[str])->Tuple[Optional[str], Optional[str]]:
+    clean=[]
+    for href in links:
+        url = _wiki_url(href)
+        if url and "wikipedia.org" not in url:
+            clean.append(url)
+    if not clean: return None, None
+    best_ath=None; best_site=None; best_score=-999
+    for url in clean:
+        score=_score_url_for_athletics(url)
+        if score>best_score:
+            best_score=score; best_ath=url
+        if (best_site is None) or urlparse(url).netloc.endswith(".edu"):
+            best_site=url
+    return best_ath, best_site
+
+def _bs_roster_link(html:str, page_url:str)->Optional[str]:
+    soup = BeautifulSoup(html, "html.parser", parse_only=_ANCHORS)
+    for a in soup.find_all("a", href=True):
+        text=" ".join(a.get_text(" ", strip=True).split()).lower()
+        if "roster" in text:
+            return urljoin(page_url, a["href"])
+    return None
+
+def _bs_state_records(html:str, st:str)->List[Dict[str,Any]]:
+    out=[]
+    soup=BeautifulSoup(html,"html.parser", parse_only=_WIKITABLES)
+    for table in soup.find_all("table", class_=lambda x: x and "wikitable" in x):
+        for tr in table.find_all("tr")[1:]:
+            tds=tr.find_all("td")
+            if not tds: continue
+            name_cell=tds[0]
+            assoc_text=" ".join(td.get_text(" ", strip=True) for td in tds[1:3]) if len(tds)>=3 else tr.get_text(" ", strip=True)
+            assoc, division = _classify_association(assoc_text)
+            athletics=_best_external_link(name_cell) or _best_external_link(tr)
+            a=name_cell.find("a", href=True)
+            out.append({
+                "school": name_cell.get_text(" ", strip=True),
+                "state": st, "association": assoc, "division": division,
+                "athletics_url": athletics, "school_wiki": _wiki_url(a["href"]) if a else None
+            })
+    return out
+
+def _bs_athletics_from_school_page(html:str, school_page_url:str)->Optional[str]:
+    soup = BeautifulSoup(html, "html.parser", parse_only=_ANCHORS)
+    return _pick_athletics_anchor(((a.get_text(" ", strip=True), a["href"]) for a in soup.find_all("a", href=True)), school_page_url)
+
+def _bs_school_wiki_links(html:str)->Tuple[Optional[str], Optional[str]]:
+    soup = BeautifulSoup(html, "html.parser", parse_only=_INFOBOX_AND_ANCHORS)
+    links=[]
+    box = soup.find("table", class_=lambda x: x and "infobox" in x)
+    if box:
+        links.extend([a["href"] for a in box.find_all("a", href=True)])
+    links.extend([a["href"] for a in soup.find_all("a", href=True)])
+    return _pick_school_links(links)
+
+def players_from_soup(soup:BeautifulSoup)->List[Dict[str,Any]]:
+    players=[]; roster_headers=("name","player","pos","position")
+    best_table=None; best_headers=[]; best_score=0
+    for table in soup.find_all("table"):
+        headers=[th.get_text(strip=True).lower() for th in table.find_all("th")]
+        score=sum(any(h in cell for cell in headers) for h in roster_headers)
+        if score>best_score: best_table, best_headers, best_score = table, headers, score
+    if best_table and best_score>0:
+        rows=[[td.get_text(" ", strip=True) for td in tr.find_all(["td"])] for tr in best_table.find_all("tr")]
+        players=_players_from_rows(best_headers, rows)
+    if not players:
+        players=_players_from_cards(" ".join(card.stripped_strings) for card in soup.select(_CARD_SELECTOR))
+    return _dedupe_players(players)
+
+def _lx_document(html:str):
+    try:
+        doc=lxml.html.document_fromstring(html)
+    except ValueError:
+        # str input with an <?xml encoding=...?> declaration
+        doc=lxml.html.document_fromstring(html.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8"))
+    except lxml.etree.ParserError:
+        return None
+    # html.parser/bs4 excludes these strings from get_text(); drop them so text matches
+    lxml.etree.strip_elements(doc, "script", "style", "template", "rt", "rp", with_tail=False)
+    return doc
+
+def _lx_text(el, sep:str=" ")->str:
+    return sep.join(t for t in (t.strip() for t in el.itertext()) if t)
+
+def _lx_has_class(el, needle:str)->bool:
+    return needle in (el.get("class") or "")
+
+def _lx_roster_link(html:str, page_url:str)->Optional[str]:
+    doc=_lx_document(html)
+    if doc is None: return None
+    for a in doc.iter("a"):
+        href=a.get("href")
+        if href is not None and "roster" in " ".join(_lx_text(a).split()).lower():
+            return urljoin(page_url, href)
+    return None
+
+def _lx_state_records(html:str, st:str)->List[Dict[str,Any]]:
+    out=[]
+    doc=_lx_document(html)
+    if doc is None: return out
+    for table in doc.iter("table"):
+        if not _lx_has_class(table, "wikitable"): continue
+        for tr in list(table.iterdescendants("tr"))[1:]:
+            tds=list(tr.iterdescendants("td"))
+            if not tds: continue
+            name_cell=tds[0]
+            assoc_text=" ".join(_lx_text(td) for td in tds[1:3]) if len(tds)>=3 else _lx_text(tr)
+            assoc, division = _classify_association(assoc_text)
+            athletics=(_pick_best_link(a.get("href") for a in name_cell.iterdescendants("a") if a.get("href") is not None)
+                       or _pick_best_link(a.get("href") for a in tr.iterdescendants("a") if a.get("href") is not None))
+            first=next((a for a in name_cell.iterdescendants("a") if a.get("href") is not None), None)
+            out.append({
+                "school": _lx_text(name_cell),
+                "state": st, "association": assoc, "division": division,
+                "athletics_url": athletics, "school_wiki": _wiki_url(first.get("href")) if first is not None else None
+            })
+    return out
+
+def _lx_athletics_from_school_page(html:str, school_page_url:str)->Optional[str]:
+    doc=_lx_document(html)
+    if doc is None: return None
+    return _pick_athletics_anchor(((_lx_text(a), a.get("href")) for a in doc.iter("a") if a.get("href") is not None), school_page_url)
+
+def _lx_school_wiki_links(html:str)->Tuple[Optional[str], Optional[str]]:
+    doc=_lx_document(html)
+    if doc is None: return None, None
+    links=[]
+    box=next((t for t in doc.iter("table") if _lx_has_class(t, "infobox")), None)
+    if box is not None:
+        links.extend(a.get("href") for a in box.iterdescendants("a") if a.get("href") is not None)
+    links.extend(a.get("href") for a in doc.iter("a") if a.get("href") is not None)
+    return _pick_school_links(links)
+
+def _lx_players(html:str)->List[Dict[str,Any]]:
+    doc=_lx_document(html)
+    if doc is None: return []
+    players=[]; roster_headers=("name","player","pos","position")
+    best_table=None; best_headers=[]; best_score=0
+    for table in doc.iter("table"):
+        headers=[_lx_text(th, "").lower() for th in table.iterdescendants("th")]
+        score=sum(any(h in cell for cell in headers) for h in roster_headers)
+        if score>best_score: best_table, best_headers, best_score = table, headers, score
+    if best_table is not None and best_score>0:
+        rows=[[_lx_text(td) for td in tr.iterdescendants("td")] for tr in best_table.iterdescendants("tr")]
+        players=_players_from_rows(best_headers, rows)
+    if not players:
+        cards=doc.xpath("//*[contains(@class,'roster') or contains(@class,'player') or contains(@class,'athlete')]")
+        players=_players_from_cards(_lx_text(card) for card in cards)
+    return _dedupe_players(players)
+
+def extract_roster_link(html:str, page_url:str)->Optional[str]:
+    return _lx_roster_link(html, page_url) if HTML_BACKEND == "lxml" else _bs_roster_link(html, page_url)
+
+def extract_state_records(html:str, st:str)->List[Dict[str,Any]]:
+    return _lx_state_records(html, st) if HTML_BACKEND == "lxml" else _bs_state_records(html, st)
+
+def extract_athletics_from_school_page(html:str, school_page_url:str)->Optional[str]:
+    if HTML_BACKEND == "lxml": return _lx_athletics_from_school_page(html, school_page_url)
+    return _bs_athletics_from_school_page(html, school_page_url)
+
+def extract_school_wiki_links(html:str)->Tuple[Optional[str], Optional[str]]:
+    return _lx_school_wiki_links(html) if HTML_BACKEND == "lxml" else _bs_school_wiki_links(html)
+
+def extract_players(html:str)->List[Dict[str,Any]]:
+    return _lx_players(html) if HTML_BACKEND == "lxml" else players_from_soup(BeautifulSoup(html,"html.parser"))
@@ -0,0 +1,134 @@
+
+import os, re, json, time, zlib, threading
+from typing import Dict, Any, List, Optional
+from scraping.cache import connect_sqlite
+from utils.scoring import normalize_position, position_index
+
+ROSTER_HISTORY_PATH = os.getenv("ROSTER_HISTORY_PATH", "/tmp/phoenix_history.sqlite3")  # "" disables history
+ROSTER_HISTORY_DECAY = float(os.getenv("ROSTER_HISTORY_DECAY", "0.6"))  # per-season decay of turnover / growth of graduation pressure
+ROSTER_HISTORY_RETAIN_DAYS = float(os.getenv("ROSTER_HISTORY_RETAIN_DAYS", "1095"))
+ROSTER_HISTORY_PURGE_EVERY = int(os.getenv("ROSTER_HISTORY_PURGE_EVERY", "500"))
+FEATURE_FLOOR = 0.01
+
+def season_of(ts:float)->int:
+    t=time.gmtime(ts)
+    return t.tm_year if t.tm_mon >= 7 else t.tm_year-1
+
+def _name_key(name:str)->str:
+    return re.sub(r"\s+", " ", (name or "").strip().lower())
+
+# a player listed at two positions is two members
+def _member_key(name:str, position:str)->str:
+    return _name_key(name)+"|"+position
+
+def _pack(members:Dict[str,Any])->bytes:
+    return zlib.compress(json.dumps(members, separators=(",",":")).encode("utf-8"), 6)
+
+def _unpack(blob:Optional[bytes])->Dict[str,Any]:
+    return json.loads(zlib.decompress(blob).decode("utf-8")) if blob else {}
+
+# roster snapshots over time: the current member set per roster plus a log of who was added / departed;
+# propensity features are folded forward on each snapshot instead of being recomputed per request
+class RosterHistory:
+    def __init__(self, path:str=ROSTER_HISTORY_PATH, decay:float=ROSTER_HISTORY_DECAY):
+        self.path=path; self.decay=decay; self.error=None; self._conn=None; self._lock=threading.Lock(); self._writes=0
+        self.snapshots=0; self.unchanged=0; self.added=0; self.departed=0
+        if not path: return
+        try:
+            conn=connect_sqlite(path)
+            conn.execute("CREATE TABLE IF NOT EXISTS rosters (url TEXT PRIMARY KEY, sport TEXT, members BLOB NOT NULL, features TEXT NOT NULL, first_seen REAL NOT NULL, last_seen REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS changes (url TEXT NOT NULL, ts REAL NOT NULL, season INTEGER NOT NULL, kind TEXT NOT NULL, name TEXT NOT NULL, position TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS changes_url_ts ON changes (url, ts)")
+            self._conn=conn
+        except Exception as e:
+            self.error=str(e); self._conn=None
+    @property
+    def enabled(self)->bool:
+        return self._conn is not None
+    def _run(self, sql:str, args:tuple=()):
+        try:
+            return self._conn.execute(sql, args).fetchall()
+        except Exception as e:
+            self.error=str(e); return []
+    # positions are counted like position_index, so a first snapshot scores the same as a plain count; graduation
+    # pressure only comes from tenure actually observed: whoever was already listed in the roster's first season
+    # may have joined any time before, and counting from then would add pressure to every one of them at rollover
+    def _fold(self, old:Dict[str,Any], prev:Dict[str,Any], cur:Dict[str,Any], departed:List[str], added:int, season:int, first_season:int,
+              positions:Dict[str,int], ts:float)->Dict[str,Any]:
+        factor=self.decay ** max(0, season-old.get("season", season))
+        turnover={p: v*factor for p, v in (old.get("turnover") or {}).items() if v*factor >= FEATURE_FLOOR}
+        for k in departed:
+            p=prev[k]["p"]; turnover[p]=turnover.get(p, 0.0)+1.0
+        pressure:Dict[str,float]={}
+        for m in cur.values():
+            extra=season-m["s"]
+            if extra > 0 and m["s"] > first_season: pressure[m["p"]]=pressure.get(m["p"], 0.0)+1.0-self.decay**extra
+        return {
+            "season":season, "size":len(cur), "snapshots":old.get("snapshots", 0)+1, "updated":ts,
+            "added_last":added, "departed_last":len(departed), "positions":positions,
+            "turnover":{p: round(v, 4) for p, v in turnover.items()}, "pressure":{p: round(v, 4) for p, v in pressure.items()},
+        }
+    # returns the roster's folded features and, per member (name and position), the seasons they have been on it
+    def record(self, url:str, sport:Optional[str], players:List[Dict[str,Any]], ts:Optional[float]=None)->Optional[Dict[str,Any]]:
+        if not self.enabled: return None
+        ts=ts or time.time(); season=season_of(ts)
+        with self._lock:
+            rows=self._run("SELECT members, features, first_seen FROM rosters WHERE url=?", (url,))
+            # rekeyed from the stored name and position, which also reads rows written when members were keyed by name
+            prev={_member_key(m["n"], m["p"]): m for m in _unpack(rows[0][0]).values()} if rows else {}
+            old=json.loads(rows[0][1]) if rows else {}
+            cur:Dict[str,Any]={}
+            for pl in players:
+                if not _name_key(pl.get("name")): continue
+                pos=normalize_position(pl.get("position")); k=_member_key(pl.get("name"), pos)
+                cur[k]={"n":pl.get("name"), "p":pos, "s":prev[k]["s"] if k in prev else season}
+            added=[k for k in cur if k not in prev]; departed=[k for k in prev if k not in cur]
+            if rows and not added and not departed and old.get("season")==season:
+                self.unchanged+=1
+                self._run("UPDATE rosters SET last_seen=? WHERE url=?", (ts, url))
+                features=old
+            else:
+                first_season=season_of(rows[0][2]) if rows else season
+                features=self._fold(old, prev, cur, departed, len(added), season, first_season, position_index(players), ts)
+                log=[(url, ts, season, "added", cur[k]["n"], cur[k]["p"]) for k in added]
+                log+=[(url, ts, season, "departed", prev[k]["n"], prev[k]["p"]) for k in departed]
+                try:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany("INSERT INTO changes (url, ts, season, kind, name, position) VALUES (?,?,?,?,?,?)", log)
+                    self._conn.execute("INSERT OR REPLACE INTO rosters (url, sport, members, features, first_seen, last_seen) VALUES (?,?,?,?,?,?)",
+                                       (url, sport, _pack(cur), json.dumps(features), rows[0][2] if rows else ts, ts))
+                    self._conn.execute("COMMIT")
+                except Exception as e:
+                    self.error=str(e)
+                    if self._conn.in_transaction: self._conn.execute("ROLLBACK")
+                self.snapshots+=1; self.added+=len(added); self.departed+=len(departed)
+                self._writes+=1
+                if ROSTER_HISTORY_PURGE_EVERY and self._writes % ROSTER_HISTORY_PURGE_EVERY == 0: self._purge()
+        return {"features":features, "seasons":{k: list(range(m["s"], season+1)) for k, m in cur.items()}}
+    def annotate(self, players:List[Dict[str,Any]], seasons:Dict[str,List[int]])->List[Dict[str,Any]]:
+        return [{**pl, "seasons":seasons.get(_member_key(pl.get("name"), normalize_position(pl.get("position"))), pl.get("seasons") or [])} for pl in players]
+    def history(self, url:str, limit:int=100)->Optional[Dict[str,Any]]:
+        if not self.enabled: return None
+        with self._lock:
+            rows=self._run("SELECT sport, features, first_seen, last_seen FROM rosters WHERE url=?", (url,))
+            if not rows: return None
+            changes=self._run("SELECT ts, season, kind, name, position FROM changes WHERE url=? ORDER BY ts DESC, rowid DESC LIMIT ?", (url, max(0, limit)))
+        sport, features, first_seen, last_seen = rows[0]
+        return {"url":url, "sport":sport, "first_seen":first_seen, "last_seen":last_seen, "features":json.loads(features),
+                "changes":[{"ts":ts, "season":s, "kind":k, "name":n, "position":p} for ts, s, k, n, p in changes]}
+    def _purge(self):
+        self._run("DELETE FROM changes WHERE ts<?", (time.time()-ROSTER_HISTORY_RETAIN_DAYS*86400.0,))
+    def clear(self):
+        with self._lock:
+            self._run("DELETE FROM changes"); self._run("DELETE FROM rosters")
+    def stats(self)->Dict[str,Any]:
+        if not self.enabled:
+            return {"enabled":False, "path":self.path, "error":self.error}
+        with self._lock:
+            rosters=self._run("SELECT COUNT(*) FROM rosters"); changes=self._run("SELECT COUNT(*) FROM changes")
+        out={"enabled":True, "path":self.path, "rosters":rosters[0][0] if rosters else 0, "change_rows":changes[0][0] if changes else 0,
+             "snapshots":self.snapshots, "unchanged":self.unchanged, "added":self.added, "departed":self.departed, "decay":self.decay}
+        if self.error: out["error"]=self.error
+        return out
+
+roster_history=RosterHistory()
@@ -0,0 +1,90 @@
+
+import os, time
+from collections import deque
+from typing import Dict, Any, Optional, List
+
+HOST_WINDOW = int(os.getenv("HOST_WINDOW", "64"))
+HOST_MIN_SAMPLES = int(os.getenv("HOST_MIN_SAMPLES", "5"))
+HOST_TIMEOUT_MULT = float(os.getenv("HOST_TIMEOUT_MULT", "3"))
+HOST_TIMEOUT_MIN = float(os.getenv("HOST_TIMEOUT_MIN", "2"))
+HOST_BREAKER_FAILURES = int(os.getenv("HOST_BREAKER_FAILURES", "5"))
+HOST_BREAKER_FAILURE_RATE = float(os.getenv("HOST_BREAKER_FAILURE_RATE", "0.5"))
+HOST_BREAKER_COOLDOWN = float(os.getenv("HOST_BREAKER_COOLDOWN", "60"))
+HOST_HEDGING = os.getenv("HOST_HEDGING", "1").strip().lower() not in ("0","false","no","")
+
+def _pct(sorted_vals:List[float], q:float)->float:
+    return sorted_vals[min(len(sorted_vals)-1, int(q*len(sorted_vals)))]
+
+class _Host:
+    __slots__=("latencies","outcomes","consecutive_failures","state","opened_at","cooldown","requests","failures","hedges","last_error")
+    def __init__(self):
+        self.latencies=deque(maxlen=HOST_WINDOW); self.outcomes=deque(maxlen=HOST_WINDOW)
+        self.consecutive_failures=0; self.state="closed"; self.opened_at=0.0; self.cooldown=HOST_BREAKER_COOLDOWN
+        self.requests=0; self.failures=0; self.hedges=0; self.last_error=None
+
+# per-host latency/failure tracking: adaptive timeouts, a circuit breaker and the hedge delay
+class HostHealth:
+    def __init__(self):
+        self.hosts:Dict[str,_Host]={}; self.rejected=0; self.hedged=0; self.hedge_wins=0
+    def _get(self, host:str)->_Host:
+        h=self.hosts.get(host)
+        if h is None: h=self.hosts[host]=_Host()
+        return h
+    def percentile(self, host:str, q:float)->Optional[float]:
+        h=self.hosts.get(host)
+        if h is None or len(h.latencies)<HOST_MIN_SAMPLES: return None
+        return _pct(sorted(h.latencies), q)
+    def timeout_for(self, host:str, default:float)->float:
+        p99=self.percentile(host, 0.99)
+        if p99 is None: return default
+        return max(HOST_TIMEOUT_MIN, min(default, p99*HOST_TIMEOUT_MULT))
+    def hedge_delay(self, host:str)->Optional[float]:
+        return self.percentile(host, 0.95) if HOST_HEDGING else None
+    def allow(self, host:str)->bool:
+        h=self.hosts.get(host)
+        if h is None or h.state=="closed": return True
+        # one trial request; a trial that never reports back (lost task) is replaced after another cooldown
+        if h.state!="closed" and time.time()-h.opened_at >= h.cooldown:
+            h.state="half_open"; h.opened_at=time.time(); return True
+        if h.state=="open" or h.state=="half_open":
+            self.rejected+=1; return False
+        return True
+    # the trial request was cancelled before it had an answer: reopen so the next one waits out the cooldown
+    def abandon(self, host:str):
+        h=self.hosts.get(host)
+        if h is not None and h.state=="half_open": h.state="open"; h.opened_at=time.time()
+    def record(self, host:str, latency:float, ok:bool, error:Optional[str]=None):
+        h=self._get(host); h.requests+=1; h.outcomes.append(ok)
+        if ok:
+            h.latencies.append(latency); h.consecutive_failures=0
+            if h.state=="half_open": h.state="closed"; h.cooldown=HOST_BREAKER_COOLDOWN
+            return
+        h.failures+=1; h.consecutive_failures+=1; h.last_error=error
+        if h.state=="half_open":
+            h.state="open"; h.opened_at=time.time(); h.cooldown=min(h.cooldown*2, HOST_BREAKER_COOLDOWN*16)
+            return
+        fails=len(h.outcomes)-sum(h.outcomes)
+        rate_trip=len(h.outcomes)>=2*HOST_MIN_SAMPLES and fails/len(h.outcomes)>=HOST_BREAKER_FAILURE_RATE
+        if h.state=="closed" and (h.consecutive_failures>=HOST_BREAKER_FAILURES or rate_trip):
+            h.state="open"; h.opened_at=time.time()
+    def host_stats(self, host:str)->Dict[str,Any]:
+        h=self.hosts[host]; lat=sorted(h.latencies)
+        return {
+            "host":host, "state":h.state, "requests":h.requests, "failures":h.failures,
+            "failure_rate":round((len(h.outcomes)-sum(h.outcomes))/len(h.outcomes),3) if h.outcomes else 0.0,
+            "p50_ms":round(1000*_pct(lat,0.5),1) if lat else None, "p95_ms":round(1000*_pct(lat,0.95),1) if lat else None,
+            "p99_ms":round(1000*_pct(lat,0.99),1) if lat else None, "timeout_s":round(self.timeout_for(host, 30.0),2),
+            "hedges":h.hedges, "reopens_in_s":round(max(0.0, h.cooldown-(time.time()-h.opened_at)),1) if h.state=="open" else None,
+            "last_error":h.last_error,
+        }
+    def stats(self, state:Optional[str]=None, limit:int=100)->Dict[str,Any]:
+        states={"closed":0,"open":0,"half_open":0}
+        for h in self.hosts.values(): states[h.state]+=1
+        names=[n for n, h in self.hosts.items() if state is None or h.state==state]
+        # unhealthy first, then slowest
+        names.sort(key=lambda n: (self.hosts[n].state=="closed", -(self.percentile(n, 0.95) or 0.0)))
+        return {"hosts_tracked":len(self.hosts), "states":states, "rejected":self.rejected,
+                "hedged":self.hedged, "hedge_wins":self.hedge_wins, "hedging":HOST_HEDGING,
+                "hosts":[self.host_stats(n) for n in names[:max(0,limit)]]}
+
+host_health=HostHealth()
@@ -0,0 +1,158 @@
+
+import os, time, asyncio
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+import aiohttp
+from scraping.rawstore import raw_store
+from scraping.hosthealth import host_health
+from scraping.scheduler import fetch_scheduler
+from utils.metrics import metrics
+
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", "8"))
+HTTP_DNS_TTL = int(os.getenv("HTTP_DNS_TTL", "300"))
+HTTP_KEEPALIVE = float(os.getenv("HTTP_KEEPALIVE", "30"))
+
+DEFAULT_HEADERS={"User-Agent":"Mozilla/5.0","Accept":"text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"}
+
+class HttpPool:
+    def __init__(self, limit:int=HTTP_POOL_LIMIT, per_host:int=HTTP_POOL_PER_HOST, dns_ttl:int=HTTP_DNS_TTL, keepalive:float=HTTP_KEEPALIVE):
+        self.limit=limit; self.per_host=per_host; self.dns_ttl=dns_ttl; self.keepalive=keepalive
+        self._session:Optional[aiohttp.ClientSession]=None; self._loop=None
+        self.sessions_created=0
+    def session(self)->aiohttp.ClientSession:
+        loop=asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            conn=aiohttp.TCPConnector(
+                ssl=False, limit=self.limit, limit_per_host=self.per_host,
+                ttl_dns_cache=self.dns_ttl, use_dns_cache=True, keepalive_timeout=self.keepalive,
+            )
+            self._session=aiohttp.ClientSession(connector=conn, headers=DEFAULT_HEADERS, timeout=aiohttp.ClientTimeout(total=None))
+            self._loop=loop; self.sessions_created+=1
+        return self._session
+    async def start(self):
+        self.session()
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session=None; self._loop=None
+    def stats(self)->Dict[str,Any]:
+        out={"limit":self.limit, "limit_per_host":self.per_host, "dns_cache_ttl":self.dns_ttl,
+             "keepalive_timeout":self.keepalive, "sessions_created":self.sessions_created, "open":False}
+        s=self._session
+        if s is None or s.closed: return out
+        conn=s.connector
+        acquired=getattr(conn, "_acquired", ()) or ()
+        idle=getattr(conn, "_conns", {}) or {}
+        per_host={}
+        for key, conns in getattr(conn, "_acquired_per_host", {}).items():
+            if conns: per_host[getattr(key, "host", str(key))]=len(conns)
+        out.update({
+            "open": True, "in_use": len(acquired), "idle": sum(len(v) for v in idle.values()),
+            "idle_hosts": len(idle), "in_use_per_host": per_host,
+        })
+        return out
+
+http_pool=HttpPool()
+
+class FetchError(Exception):
+    def __init__(self, url:str, status:int=0, reason:str=""):
+        super().__init__("{} {}".format(status or reason, url)); self.url=url; self.status=status
+
+class CircuitOpenError(FetchError):
+    pass
+
+async def _request(session:aiohttp.ClientSession, url:str, headers:Dict[str,str], timeout:float)->Tuple[int,str,Optional[str],Optional[str]]:
+    async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+        text="" if resp.status == 304 else await resp.text()
+        return resp.status, text, resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+
+# send a second copy (hedge_factory) once the first runs past the host's p95; first successful answer wins
+async def _hedged(factory, hedge_factory, delay:Optional[float], host:str):
+    first=asyncio.ensure_future(factory()); tasks={first}
+    try:
+        if delay is None:
+            return await first
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            host_health.hedged+=1; host_health._get(host).hedges+=1
+            tasks.add(asyncio.ensure_future(hedge_factory()))
+        err=None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    if t is not first: host_health.hedge_wins+=1
+                    return t.result()
+                err=t.exception()
+        raise err
+    finally:
+        for t in tasks: t.cancel()
+
+async def _network_get(session:aiohttp.ClientSession, url:str, headers:Dict[str,str], timeout:float):
+    host=(urlparse(url).netloc or "").lower()
+    if not host_health.allow(host):
+        raise CircuitOpenError(url, reason="circuit open")
+    def request():
+        return _request(session, url, headers, host_health.timeout_for(host, timeout))
+    # the hedged copy is a request like any other: it waits for its own slot and token
+    async def hedge():
+        async with fetch_scheduler.slot(url):
+            return await request()
+    t0=time.monotonic()
+    try:
+        async with fetch_scheduler.slot(url):
+            t0=time.monotonic()
+            res=await _hedged(request, hedge, host_health.hedge_delay(host), host)
+    except asyncio.CancelledError:
+        host_health.abandon(host)
+        raise
+    except Exception as e:
+        host_health.record(host, time.monotonic()-t0, False, type(e).__name__)
+        raise
+    status=res[0]
+    fetch_scheduler.note_status(host, status)
+    host_health.record(host, time.monotonic()-t0, status < 500 and status != 429, None if status < 500 and status != 429 else "HTTP {}".format(status))
+    return res
+
+def _status_class(status:int)->str:
+    return "{}xx".format(status//100) if status else "none"
+
+async def fetch_text(session:aiohttp.ClientSession, url:str, timeout:float, raise_for_status:bool=False)->Tuple[int,str]:
+    t0=time.perf_counter(); info={"source":"network"}
+    try:
+        status, text = await _fetch_text(session, url, timeout, raise_for_status, info)
+    except Exception as e:
+        metrics.record("fetch", time.perf_counter()-t0, {"source":info["source"], "status":_status_class(e.status) if getattr(e, "status", 0) else "error"},
+                       url=url, error=type(e).__name__)
+        raise
+    metrics.inc("fetch_bytes_total", len(text), source=info["source"])
+    metrics.record("fetch", time.perf_counter()-t0, {"source":info["source"], "status":_status_class(status)}, url=url, bytes=len(text))
+    return status, text
+
+# GET through the raw-response store: recently validated bodies are served from disk, older ones are
+# revalidated with If-None-Match / If-Modified-Since and a 304 reuses the stored body
+async def _fetch_text(session:aiohttp.ClientSession, url:str, timeout:float, raise_for_status:bool, info:Dict[str,str])->Tuple[int,str]:
+    meta=await asyncio.to_thread(raw_store.lookup, url) if raw_store.enabled else None
+    if meta and meta["fresh"]:
+        body=await asyncio.to_thread(raw_store.body, meta["hash"])
+        if body is not None:
+            raw_store.fresh_hits+=1; info["source"]="raw_fresh"
+            return 200, body
+    for conditional in ((True, False) if meta else (False,)):
+        headers={}
+        if conditional:
+            if meta.get("etag"): headers["If-None-Match"]=meta["etag"]
+            if meta.get("last_modified"): headers["If-Modified-Since"]=meta["last_modified"]
+        status, text, etag, last_modified = await _network_get(session, url, headers, timeout)
+        if status == 304 and conditional:
+            body=await asyncio.to_thread(raw_store.body, meta["hash"])
+            if body is not None:
+                await asyncio.to_thread(raw_store.touch, url, len(body)); info["source"]="not_modified"
+                return 200, body
+            continue  # stored body is gone; fetch unconditionally
+        if raise_for_status and status >= 400: raise FetchError(url, status)
+        if status == 200 and raw_store.enabled:
+            await asyncio.to_thread(raw_store.save, url, text, etag, last_modified)
+        return status, text
+    return 0, ""
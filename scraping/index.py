@@ -0,0 +1,33 @@
+
+import os, time
+from typing import Dict, Any, List, Optional
+from scraping.cache import TieredCache
+
+INDEX_RETAIN_DAYS = float(os.getenv("INDEX_RETAIN_DAYS", "30"))
+
+def fresh(ts:Optional[float], max_age:float)->bool:
+    return ts is not None and (time.time()-ts) < max_age
+
+# per-state and per-school program index; entries carry their own timestamps so staleness is judged per
+# query while the cache tiers only enforce retention
+class ProgramIndex:
+    def __init__(self):
+        retain=INDEX_RETAIN_DAYS*86400.0
+        self.states=TieredCache("index_states", retain, max_items=64, max_bytes=16*1024*1024, disk_max_items=1000)
+        self.schools=TieredCache("index_schools", retain, max_items=20000, max_bytes=32*1024*1024, disk_max_items=200000)
+    @staticmethod
+    def school_key(rec:Dict[str,Any])->str:
+        return "{}::{}".format(rec.get("state"), (rec.get("school_wiki") or rec.get("school") or "").lower())
+    # get_entry: snapshot rows past retention still count, their own ts decides whether they need a refresh
+    async def get_state(self, st:str, max_age:float)->Optional[List[Dict[str,Any]]]:
+        hit=await self.states.aget_entry(st); entry=hit[0] if hit else None
+        return entry["records"] if entry and fresh(entry.get("ts"), max_age) else None
+    async def put_state(self, st:str, records:List[Dict[str,Any]]):
+        await self.states.aset(st, {"records":records, "ts":time.time()})
+    async def get_school(self, key:str)->Dict[str,Any]:
+        hit=await self.schools.aget_entry(key); entry=hit[0] if hit else None
+        return {**entry, "rosters":dict(entry.get("rosters") or {})} if entry else {"rosters":{}}
+    async def put_school(self, key:str, entry:Dict[str,Any]):
+        await self.schools.aset(key, entry)
+
+program_index=ProgramIndex()
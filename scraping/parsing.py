@@ -0,0 +1,78 @@
+
+import os, time, asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Any, Callable, Optional
+from scraping.cache import TieredCache
+from scraping.rawstore import content_hash
+from scraping.extract import HTML_BACKEND
+from utils.metrics import metrics
+
+PARSE_POOL_KIND = os.getenv("PARSE_POOL_KIND", "thread").strip().lower()  # thread | process | inline
+PARSE_POOL_WORKERS = int(os.getenv("PARSE_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARSED_CACHE_TTL_DAYS = float(os.getenv("PARSED_CACHE_TTL_DAYS", "30"))
+APP_VERSION = os.getenv("APP_VERSION", "3.2.1")
+
+def _timed(fn:Callable, *args):
+    t0=time.perf_counter()
+    return fn(*args), time.perf_counter()-t0
+
+# runs html extraction off the event loop so the loop only does I/O
+class ParsePool:
+    def __init__(self, kind:str=PARSE_POOL_KIND, workers:int=PARSE_POOL_WORKERS):
+        self.kind=kind if kind in ("thread","process","inline") else "thread"; self.workers=max(1,workers)
+        self._executor:Optional[Executor]=None
+        self.submitted=0; self.completed=0; self.failed=0; self.queue_depth=0; self.max_queue_depth=0
+        self.parse_seconds=0.0; self.wait_seconds=0.0; self.max_parse_seconds=0.0
+        self.by_fn:Dict[str,Dict[str,float]]={}
+        self.parsed=TieredCache("parsed", PARSED_CACHE_TTL_DAYS*86400.0, max_items=4096, max_bytes=32*1024*1024, disk_max_items=100000)
+        self.reused=0
+    def _get_executor(self)->Executor:
+        if self._executor is None:
+            if self.kind=="process":
+                self._executor=ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor=ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="parse")
+        return self._executor
+    async def run(self, fn:Callable, *args)->Any:
+        self.submitted+=1; self.queue_depth+=1; self.max_queue_depth=max(self.max_queue_depth, self.queue_depth)
+        t0=time.perf_counter()
+        try:
+            if self.kind=="inline":
+                result, took = _timed(fn, *args)
+            else:
+                result, took = await asyncio.get_running_loop().run_in_executor(self._get_executor(), _timed, fn, *args)
+        except Exception:
+            self.failed+=1
+            raise
+        finally:
+            self.queue_depth-=1
+        self.completed+=1; self.parse_seconds+=took; self.max_parse_seconds=max(self.max_parse_seconds, took)
+        self.wait_seconds+=max(0.0, time.perf_counter()-t0-took)
+        st=self.by_fn.setdefault(fn.__name__, {"calls":0, "seconds":0.0})
+        st["calls"]+=1; st["seconds"]+=took
+        metrics.record("parse", took, {"extractor":fn.__name__}, bytes=len(args[0]) if args and isinstance(args[0], str) else None)
+        return result
+    # same extractor + backend + content hash + extra args -> reuse the stored result instead of re-parsing
+    async def run_cached(self, fn:Callable, html:str, *args)->Any:
+        key="{}:{}:{}:{}:{}".format(APP_VERSION, HTML_BACKEND, fn.__name__, content_hash(html), "|".join(map(str, args)))
+        hit=await self.parsed.aget(key)
+        if hit is not None:
+            self.reused+=1; metrics.inc("parse_reused_total", extractor=fn.__name__)
+            return hit["v"]
+        result=await self.run(fn, html, *args)
+        await self.parsed.aset(key, {"v":result})
+        return result
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True); self._executor=None
+    def stats(self)->Dict[str,Any]:
+        done=self.completed or 1
+        return {
+            "kind":self.kind, "workers":self.workers, "submitted":self.submitted, "completed":self.completed,
+            "failed":self.failed, "reused":self.reused, "queue_depth":self.queue_depth, "max_queue_depth":self.max_queue_depth,
+            "parse_seconds_total":round(self.parse_seconds,4), "parse_ms_avg":round(1000*self.parse_seconds/done,3),
+            "parse_ms_max":round(1000*self.max_parse_seconds,3), "queue_wait_ms_avg":round(1000*self.wait_seconds/done,3),
+            "by_extractor":{k:{"calls":int(v["calls"]), "ms_avg":round(1000*v["seconds"]/max(1,v["calls"]),3)} for k, v in self.by_fn.items()},
+        }
+
+parse_pool=ParsePool()
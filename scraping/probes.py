@@ -0,0 +1,96 @@
+
+import os
+from typing import Dict, Any, List, Optional, Tuple
+from scraping.cache import TieredCache
+
+PROBE_NEGATIVE_TTL_HOURS = float(os.getenv("PROBE_NEGATIVE_TTL_HOURS", "6"))
+PROBE_PLAN_TTL_DAYS = float(os.getenv("PROBE_PLAN_TTL_DAYS", "30"))
+
+# (name, kind, pattern); "direct" probes accept the URL itself, "link" probes scan the page for a roster anchor
+PROBE_TEMPLATES: List[Tuple[str,str,str]] = [
+    ("sports_roster", "direct", "{base}/sports/{slug}/roster"),
+    ("slug_roster",   "direct", "{base}/{slug}/roster"),
+    ("roster_aspx",   "direct", "{base}/roster.aspx?path={slug}"),
+    ("sports_page",   "direct", "{base}/sports/{slug}"),
+    ("slug_page",     "direct", "{base}/{slug}"),
+    ("link_sports",   "link",   "{base}/sports/{slug}"),
+    ("link_slug",     "link",   "{base}/{slug}"),
+    ("link_home",     "link",   "{base}"),
+]
+_TEMPLATE_BY_NAME = {t[0]: t for t in PROBE_TEMPLATES}
+# direct probes whose URL says nothing about rosters: any 200 page mentioning "roster" passes, so they only run
+# after the others however often they have matched elsewhere
+WEAK_TEMPLATES = frozenset(("sports_page", "slug_page"))
+# takes the homepage's first roster link whatever the sport, so it is only a last resort: always tried last, never
+# ranked up by counts nor learned as a host's first choice
+LAST_TEMPLATES = ("link_home",)
+# statuses that say the URL does not exist; throttling and server errors are never cached as misses
+NEGATIVE_STATUSES = frozenset((404, 410))
+
+VENDOR_SIGNATURES = {
+    "sidearm": ("sidearmsports.com", "sidearm"),
+    "presto": ("prestosports.com", "presto-sports", "prestosports"),
+    "wmt": ("wmt.digital", "wmt-"),
+    "neulion": ("neulion",),
+}
+
+def vendor_for(host:str, html:str="")->Optional[str]:
+    host=(host or "").lower()
+    for vendor, sigs in VENDOR_SIGNATURES.items():
+        if any(s in host for s in sigs): return vendor
+    if html:
+        head=html[:20000].lower()
+        for vendor, sigs in VENDOR_SIGNATURES.items():
+            if any(s in head for s in sigs): return vendor
+    return None
+
+def probe_url(name:str, base:str, slug:str)->Tuple[str,str]:
+    _, kind, pattern = _TEMPLATE_BY_NAME[name]
+    return kind, pattern.format(base=base, slug=slug)
+
+# orders roster probes by what worked before (host first, then vendor, then overall) and remembers dead URLs
+class ProbePlanner:
+    def __init__(self):
+        self.negative=TieredCache("probe_negative", PROBE_NEGATIVE_TTL_HOURS*3600.0, max_items=20000, max_bytes=8*1024*1024, disk_max_items=100000)
+        self.plans=TieredCache("probe_plans", PROBE_PLAN_TTL_DAYS*86400.0, max_items=10000, max_bytes=8*1024*1024, disk_max_items=50000)
+        self.planned=0; self.first_try_hits=0; self.probes=0; self.negative_skips=0; self.successes=0
+    async def _counts(self, key:str)->Dict[str,int]:
+        return await self.plans.aget(key) or {}
+    async def plan(self, host:str)->List[str]:
+        self.planned+=1
+        first:List[str]=[]; ranked:List[str]=[]
+        learned=await self.plans.aget("host:"+host)
+        if learned and learned.get("template") in _TEMPLATE_BY_NAME and learned["template"] not in LAST_TEMPLATES: first.append(learned["template"])
+        vendor=(learned or {}).get("vendor") or vendor_for(host)
+        for key in (["vendor:"+vendor] if vendor else [])+["global"]:
+            counts=await self._counts(key)
+            for name, _ in sorted(counts.items(), key=lambda kv: -kv[1]):
+                if name in _TEMPLATE_BY_NAME and name not in first+ranked+list(LAST_TEMPLATES): ranked.append(name)
+        ranked.extend(n for n, _, _ in PROBE_TEMPLATES if n not in first+ranked+list(LAST_TEMPLATES))
+        # what worked on this very host stays first; otherwise weak templates go last (the sort is stable)
+        return first+sorted(ranked, key=lambda n: n in WEAK_TEMPLATES)+list(LAST_TEMPLATES)
+    # a missing URL is missing for every template; a page without a roster link is only a miss for "link" probes,
+    # since a "direct" probe of the same URL may still accept it
+    async def is_negative(self, url:str, kind:str="direct")->bool:
+        if await self.negative.aget(url) in NEGATIVE_STATUSES or (kind=="link" and await self.negative.aget("link:"+url) is not None):
+            self.negative_skips+=1; return True
+        return False
+    # only definitive misses: a missing page, or a fetched page that had no roster link
+    async def mark_negative(self, url:str, status:int, kind:str="direct"):
+        if status in NEGATIVE_STATUSES: await self.negative.aset(url, status)
+        elif status==200 and kind=="link": await self.negative.aset("link:"+url, status)
+    async def record(self, host:str, name:str, attempt:int, html:str=""):
+        self.successes+=1
+        if attempt==0: self.first_try_hits+=1
+        if name in LAST_TEMPLATES: return
+        vendor=vendor_for(host, html)
+        await self.plans.aset("host:"+host, {"template":name, "vendor":vendor})
+        for key in (["vendor:"+vendor] if vendor else [])+["global"]:
+            counts=await self._counts(key); counts[name]=counts.get(name, 0)+1
+            await self.plans.aset(key, counts)
+    def stats(self)->Dict[str,Any]:
+        return {"planned":self.planned, "probes":self.probes, "successes":self.successes,
+                "first_try_hits":self.first_try_hits, "negative_skips":self.negative_skips,
+                "probes_per_success":round(self.probes/self.successes, 2) if self.successes else None}
+
+probe_planner=ProbePlanner()
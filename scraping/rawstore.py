@@ -0,0 +1,85 @@
+
+import os, time, zlib, hashlib, threading
+from typing import Dict, Any, Optional
+from scraping.cache import connect_sqlite
+
+RAW_STORE_PATH = os.getenv("RAW_STORE_PATH", "/tmp/phoenix_raw.sqlite3")  # "" disables the store
+RAW_STORE_FRESH_SECONDS = float(os.getenv("RAW_STORE_FRESH_SECONDS", "600"))  # serve without revalidating inside this window
+RAW_STORE_RETAIN_DAYS = float(os.getenv("RAW_STORE_RETAIN_DAYS", "30"))
+RAW_STORE_MAX_BODY_BYTES = int(os.getenv("RAW_STORE_MAX_BODY_MB", "5")) * 1024 * 1024
+RAW_STORE_PURGE_EVERY = int(os.getenv("RAW_STORE_PURGE_EVERY", "500"))
+
+def content_hash(text:str)->str:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+# compressed, content-addressed store of raw response bodies plus per-URL validators (ETag / Last-Modified)
+class RawStore:
+    def __init__(self, path:str=RAW_STORE_PATH):
+        self.path=path; self.error=None; self._conn=None; self._lock=threading.Lock(); self._saves=0
+        self.fresh_hits=0; self.not_modified=0; self.stored=0; self.deduped=0; self.bytes_saved=0
+        if not path: return
+        try:
+            conn=connect_sqlite(path)
+            conn.execute("CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL, stored REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, hash TEXT NOT NULL, etag TEXT, last_modified TEXT, fetched REAL NOT NULL, validated REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS urls_validated ON urls (validated)")
+            self._conn=conn
+        except Exception as e:
+            self.error=str(e); self._conn=None
+    @property
+    def enabled(self)->bool:
+        return self._conn is not None
+    def _run(self, sql:str, args:tuple=()):
+        if self._conn is None: return []
+        try:
+            with self._lock:
+                return self._conn.execute(sql, args).fetchall()
+        except Exception as e:
+            self.error=str(e); return []
+    def lookup(self, url:str)->Optional[Dict[str,Any]]:
+        rows=self._run("SELECT hash, etag, last_modified, fetched, validated FROM urls WHERE url=?", (url,))
+        if not rows: return None
+        h, etag, lm, fetched, validated = rows[0]
+        return {"hash":h, "etag":etag, "last_modified":lm, "fetched":fetched, "validated":validated,
+                "fresh":(time.time()-validated) < RAW_STORE_FRESH_SECONDS}
+    def body(self, h:str)->Optional[str]:
+        rows=self._run("SELECT body FROM blobs WHERE hash=?", (h,))
+        if not rows: return None
+        try:
+            return zlib.decompress(rows[0][0]).decode("utf-8", "surrogatepass")
+        except Exception:
+            return None
+    def save(self, url:str, text:str, etag:Optional[str]=None, last_modified:Optional[str]=None)->Optional[str]:
+        if not self.enabled: return None
+        raw=text.encode("utf-8", "surrogatepass")
+        if len(raw) > RAW_STORE_MAX_BODY_BYTES: return None
+        h=content_hash(text); now=time.time()
+        if self._run("SELECT 1 FROM blobs WHERE hash=?", (h,)):
+            self.deduped+=1
+        else:
+            self._run("INSERT OR IGNORE INTO blobs (hash, body, size, stored) VALUES (?,?,?,?)", (h, zlib.compress(raw, 6), len(raw), now))
+            self.stored+=1
+        self._run("INSERT OR REPLACE INTO urls (url, hash, etag, last_modified, fetched, validated) VALUES (?,?,?,?,?,?)",
+                  (url, h, etag, last_modified, now, now))
+        self._saves+=1
+        if RAW_STORE_PURGE_EVERY and self._saves % RAW_STORE_PURGE_EVERY == 0: self.purge()
+        return h
+    def touch(self, url:str, size:int=0):
+        self.not_modified+=1; self.bytes_saved+=size
+        self._run("UPDATE urls SET validated=? WHERE url=?", (time.time(), url))
+    def purge(self):
+        cutoff=time.time()-RAW_STORE_RETAIN_DAYS*86400.0
+        self._run("DELETE FROM urls WHERE validated<?", (cutoff,))
+        self._run("DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM urls)")
+    def clear(self):
+        self._run("DELETE FROM urls"); self._run("DELETE FROM blobs")
+    def stats(self)->Dict[str,Any]:
+        urls=self._run("SELECT COUNT(*) FROM urls"); blobs=self._run("SELECT COUNT(*), COALESCE(SUM(size),0), COALESCE(SUM(LENGTH(body)),0) FROM blobs")
+        out={"enabled":self.enabled, "path":self.path, "urls":urls[0][0] if urls else 0,
+             "blobs":blobs[0][0] if blobs else 0, "raw_bytes":blobs[0][1] if blobs else 0, "compressed_bytes":blobs[0][2] if blobs else 0,
+             "fresh_hits":self.fresh_hits, "not_modified":self.not_modified, "stored":self.stored, "deduped":self.deduped,
+             "bytes_not_downloaded":self.bytes_saved, "fresh_seconds":RAW_STORE_FRESH_SECONDS}
+        if self.error: out["error"]=self.error
+        return out
+
+raw_store=RawStore()
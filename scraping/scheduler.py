@@ -0,0 +1,145 @@
+
+import os, time, heapq, asyncio, itertools
+from collections import OrderedDict
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse
+
+FETCH_MAX_INFLIGHT = int(os.getenv("FETCH_MAX_INFLIGHT", "32"))
+FETCH_PER_HOST = int(os.getenv("FETCH_PER_HOST", os.getenv("DISCOVERY_PER_HOST", "4")))
+HOST_RATE_PER_SEC = float(os.getenv("HOST_RATE_PER_SEC", "5"))
+HOST_BURST = float(os.getenv("HOST_BURST", "10"))
+HOST_RATE_OVERRIDES = os.getenv("HOST_RATE_OVERRIDES", "")  # "en.wikipedia.org=10,example.edu=1"
+HOST_RATE_MIN = 0.2
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+_priority: ContextVar[int] = ContextVar("fetch_priority", default=INTERACTIVE)
+
+@contextmanager
+def priority(level:int):
+    token=_priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority()->int:
+    return _priority.get()
+
+def _parse_overrides(spec:str)->Dict[str,float]:
+    out={}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            host, rate = part.split("=", 1)
+            try: out[host.strip().lower()]=float(rate)
+            except ValueError: pass
+    return out
+
+class _Bucket:
+    __slots__=("base","rate","burst","tokens","updated")
+    def __init__(self, rate:float, burst:float):
+        self.base=rate; self.rate=rate; self.burst=max(1.0, burst); self.tokens=self.burst; self.updated=time.monotonic()
+    def refill(self, now:float):
+        self.tokens=min(self.burst, self.tokens+(now-self.updated)*self.rate); self.updated=now
+    def wait_time(self)->float:
+        return 0.0 if self.tokens>=1.0 else (1.0-self.tokens)/self.rate
+
+# central outbound fetch scheduler: per-host token buckets, global + per-host in-flight caps,
+# priority classes (interactive before background) and round-robin fairness across hosts
+class FetchScheduler:
+    def __init__(self, max_inflight:int=FETCH_MAX_INFLIGHT, per_host:int=FETCH_PER_HOST,
+                 rate:float=HOST_RATE_PER_SEC, burst:float=HOST_BURST, overrides:Optional[Dict[str,float]]=None):
+        self.max_inflight=max(1,max_inflight); self.per_host=max(1,per_host); self.rate=rate; self.burst=burst
+        self.overrides=_parse_overrides(HOST_RATE_OVERRIDES) if overrides is None else overrides
+        self.inflight=0; self.host_inflight:Dict[str,int]={}
+        self.buckets:Dict[str,_Bucket]={}; self.queues:Dict[str,List[list]]={}
+        self.rotation:"OrderedDict[str,None]"=OrderedDict(); self._seq=itertools.count(); self._timer=None
+        self.granted={p:0 for p in PRIORITY_NAMES}; self.wait_seconds={p:0.0 for p in PRIORITY_NAMES}
+        self.throttled=0; self.rate_limited=0
+    def _bucket(self, host:str)->_Bucket:
+        b=self.buckets.get(host)
+        if b is None: b=self.buckets[host]=_Bucket(self.overrides.get(host, self.rate), self.burst)
+        return b
+    # drops cancelled waiters from the head of a host's heap, and the host itself once nothing is left
+    def _prune(self, host:str)->Optional[List[list]]:
+        q=self.queues.get(host)
+        while q and q[0][2].done(): heapq.heappop(q)
+        if q: return q
+        self.queues.pop(host, None); self.rotation.pop(host, None)
+        return None
+    def _pump(self):
+        self._timer=None
+        now=time.monotonic(); next_wait=None
+        while self.inflight < self.max_inflight:
+            best=None
+            for host in list(self.rotation):
+                q=self._prune(host)
+                if not q or self.host_inflight.get(host,0) >= self.per_host: continue
+                b=self._bucket(host); b.refill(now)
+                if b.tokens < 1.0:
+                    w=b.wait_time(); next_wait=w if next_wait is None else min(next_wait, w)
+                    continue
+                if best is None or q[0][0] < best[1]:
+                    best=(host, q[0][0])
+                    if best[1]==INTERACTIVE: break
+            if best is None: break
+            host=best[0]; entry=heapq.heappop(self.queues[host])
+            self._bucket(host).tokens-=1.0
+            self.inflight+=1; self.host_inflight[host]=self.host_inflight.get(host,0)+1
+            self.rotation.move_to_end(host)
+            self._prune(host)
+            entry[2].set_result(now)
+        if next_wait is not None and self.queues:
+            self._timer=asyncio.get_running_loop().call_later(max(0.005, next_wait), self._pump)
+    def _release(self, host:str):
+        self.inflight-=1
+        n=self.host_inflight.get(host,1)-1
+        if n>0: self.host_inflight[host]=n
+        else: self.host_inflight.pop(host, None)
+        if self._timer is not None: self._timer.cancel()
+        self._pump()
+    def note_status(self, host:str, status:int):
+        b=self._bucket(host)
+        if status == 429:
+            self.rate_limited+=1; b.rate=max(HOST_RATE_MIN, b.rate/2.0)
+        elif b.rate < b.base:
+            b.rate=min(b.base, b.rate+0.1*b.base)
+    @asynccontextmanager
+    async def slot(self, url:str):
+        host=(urlparse(url).netloc or "").lower(); prio=_priority.get()
+        fut=asyncio.get_running_loop().create_future(); t0=time.monotonic()
+        heapq.heappush(self.queues.setdefault(host, []), [prio, next(self._seq), fut])
+        self.rotation[host]=None
+        if self._timer is not None: self._timer.cancel()
+        self._pump()
+        if not fut.done(): self.throttled+=1
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled(): self._release(host)
+            else: fut.cancel(); self._prune(host)
+            raise
+        self.granted[prio]+=1; self.wait_seconds[prio]+=time.monotonic()-t0
+        try:
+            yield
+        finally:
+            self._release(host)
+    def stats(self)->Dict[str,Any]:
+        waiting={PRIORITY_NAMES[p]:0 for p in PRIORITY_NAMES}
+        for q in self.queues.values():
+            for prio, _, fut in q:
+                if not fut.done(): waiting[PRIORITY_NAMES[prio]]+=1
+        return {
+            "max_inflight":self.max_inflight, "per_host":self.per_host, "rate_per_sec":self.rate, "burst":self.burst,
+            "inflight":self.inflight, "waiting":waiting, "hosts_waiting":len(self.queues), "throttled":self.throttled,
+            "rate_limited_429":self.rate_limited,
+            "granted":{PRIORITY_NAMES[p]:n for p, n in self.granted.items()},
+            "avg_wait_ms":{PRIORITY_NAMES[p]:round(1000*self.wait_seconds[p]/self.granted[p],2) if self.granted[p] else 0.0 for p in PRIORITY_NAMES},
+            "slowed_hosts":{h:round(b.rate,2) for h, b in self.buckets.items() if b.rate < b.base},
+        }
+
+fetch_scheduler=FetchScheduler()
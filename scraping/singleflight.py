@@ -0,0 +1,43 @@
+
+import asyncio
+from typing import Dict, Any, Callable, Awaitable
+
+flights:Dict[str,"SingleFlight"]={}
+
+# concurrent callers with the same key await one shared task instead of duplicating the work
+class SingleFlight:
+    def __init__(self, name:str):
+        self.name=name; self._inflight:Dict[str,asyncio.Future]={}; self._waiters:Dict[str,int]={}
+        self.calls=0; self.coalesced=0; self.peak_waiters=0
+        flights[name]=self
+    def _done(self, key:str, task:asyncio.Future):
+        if self._inflight.get(key) is task: self._inflight.pop(key, None)
+        if not task.cancelled(): task.exception()  # mark retrieved even when every waiter went away
+    async def do(self, key:str, factory:Callable[[],Awaitable[Any]])->Any:
+        self.calls+=1
+        task=self._inflight.get(key)
+        if task is None:
+            task=asyncio.ensure_future(factory()); self._inflight[key]=task
+            task.add_done_callback(lambda t, key=key: self._done(key, t))
+        else:
+            self.coalesced+=1
+        self._waiters[key]=self._waiters.get(key, 0)+1
+        self.peak_waiters=max(self.peak_waiters, self._waiters[key])
+        try:
+            # shield: one caller timing out must not cancel the crawl the others are waiting on
+            return await asyncio.shield(task)
+        finally:
+            n=self._waiters.get(key, 1)-1
+            if n>0: self._waiters[key]=n
+            else: self._waiters.pop(key, None)
+    # for shutdown: stop shared work before the resources it uses go away
+    async def cancel_all(self):
+        tasks=list(self._inflight.values())
+        for t in tasks: t.cancel()
+        if tasks: await asyncio.gather(*tasks, return_exceptions=True)
+    def stats(self)->Dict[str,Any]:
+        return {"in_flight":len(self._inflight), "waiters":sum(self._waiters.values()),
+                "calls":self.calls, "coalesced":self.coalesced, "peak_waiters":self.peak_waiters}
+
+def singleflight_stats()->Dict[str,Any]:
+    return {name:f.stats() for name, f in flights.items()}
@@ -0,0 +1,141 @@
+
+# Read-only index snapshot baked into the image so a fresh instance answers from warm data on its first request.
+# Build: python -m scraping.snapshot build --targets "football@west;baseball@south" [--rosters] [--out PATH]
+import os, sys, json, time, sqlite3, asyncio, argparse, threading
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import quote
+from scraping.cache import caches, attach_snapshot, _store
+
+APP_VERSION = os.getenv("APP_VERSION", "3.2.1")
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "snapshot", "index.sqlite3"))
+SNAPSHOT_MMAP_MB = int(os.getenv("SNAPSHOT_MMAP_MB", "256"))
+SNAPSHOT_FORMAT = 1
+INDEX_NAMESPACES = ("discovery", "index_states", "index_schools", "probe_plans")
+ROSTER_NAMESPACES = ("rosters", "parsed")
+
+# entries are copied verbatim from the disk tier (zlib'd JSON), so nothing is decoded until a key is asked for
+class IndexSnapshot:
+    def __init__(self, path:str=SNAPSHOT_PATH):
+        self.path=path; self.meta:Dict[str,Any]={}; self.error=None; self.hits=0; self.misses=0
+        self._conn:Optional[sqlite3.Connection]=None; self._opened=False; self._namespaces=set(); self._lock=threading.Lock()
+    def open(self):
+        self._opened=True
+        if not self.path or not os.path.exists(self.path): return
+        t0=time.perf_counter()
+        try:
+            conn=sqlite3.connect("file:{}?mode=ro&immutable=1".format(quote(os.path.abspath(self.path))), uri=True, check_same_thread=False)
+            conn.execute("PRAGMA mmap_size={}".format(SNAPSHOT_MMAP_MB*1024*1024))
+            meta={k:json.loads(v) for k, v in conn.execute("SELECT key, value FROM meta")}
+            if meta.get("format")!=SNAPSHOT_FORMAT:
+                conn.close(); self.error="unsupported snapshot format {!r}".format(meta.get("format")); return
+            # cached payloads follow the code that wrote them, and APP_VERSION also keys the parse cache
+            if meta.get("app_version")!=APP_VERSION:
+                conn.close(); self.meta=meta; self.error="snapshot built by app version {!r}, running {!r}".format(meta.get("app_version"), APP_VERSION); return
+        except Exception as e:
+            self.error=str(e); return
+        self._conn=conn; self.meta=meta; self._namespaces=set(meta.get("namespaces", {}))
+        self.meta["open_ms"]=round(1000*(time.perf_counter()-t0), 2)
+    def close(self):
+        if self._conn is not None: self._conn.close()
+        self._conn=None; self._opened=False; self._namespaces=set(); self.meta={}
+    def get(self, ns:str, key:str)->Optional[Tuple[bytes,float]]:
+        if not self._opened: self.open()
+        if self._conn is None or ns not in self._namespaces: return None
+        try:
+            with self._lock:
+                row=self._conn.execute("SELECT value, ts FROM entries WHERE ns=? AND key=?", (ns, key)).fetchone()
+        except Exception as e:
+            self.error=str(e); return None
+        if row is None: self.misses+=1; return None
+        self.hits+=1
+        return row[0], row[1]
+    def stats(self)->Dict[str,Any]:
+        out={"path":self.path, "loaded":self._conn is not None, "hits":self.hits, "misses":self.misses, **self.meta}
+        if self.error: out["error"]=self.error
+        return out
+
+index_snapshot=IndexSnapshot()
+attach_snapshot(index_snapshot)
+
+# copies the given namespaces out of the cache tiers into a new snapshot file, swapped in atomically
+def export_snapshot(path:str=SNAPSHOT_PATH, namespaces:Tuple[str,...]=INDEX_NAMESPACES, targets:Optional[List[str]]=None)->Dict[str,Any]:
+    d=os.path.dirname(path)
+    if d: os.makedirs(d, exist_ok=True)
+    tmp=path+".tmp"
+    if os.path.exists(tmp): os.remove(tmp)
+    conn=sqlite3.connect(tmp)
+    try:
+        conn.execute("CREATE TABLE entries (ns TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, ts REAL NOT NULL, PRIMARY KEY (ns, key)) WITHOUT ROWID")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        counts:Dict[str,Dict[str,int]]={}
+        for ns in namespaces:
+            c=caches.get(ns)
+            rows=c.items() if c is not None else _store.items(ns)  # the CLI export may not have imported every cache
+            if not rows: continue
+            conn.executemany("INSERT OR REPLACE INTO entries (ns, key, value, ts) VALUES (?,?,?,?)", [(ns, k, v, ts) for k, v, ts in rows])
+            counts[ns]={"entries":len(rows), "bytes":sum(len(v) for _, v, _ in rows)}
+        meta={"format":SNAPSHOT_FORMAT, "app_version":APP_VERSION, "created":time.time(), "namespaces":counts, "targets":targets or []}
+        conn.executemany("INSERT INTO meta (key, value) VALUES (?,?)", [(k, json.dumps(v)) for k, v in meta.items()])
+        conn.commit(); conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+    return {**meta, "path":path, "bytes":os.path.getsize(path)}
+
+# crawls the targets through rebuild_index (and optionally every roster found), then exports
+async def build_snapshot(targets:str, path:str=SNAPSHOT_PATH, rosters:bool=False, concurrency:int=8)->Dict[str,Any]:
+    from scraping.discovery import rebuild_index
+    from scraping.warmup import parse_targets
+    built:Dict[str,Any]={}; roster_urls=set()
+    for sports, region in parse_targets(targets):
+        label="{}@{}".format(",".join(sports), region); t0=time.time()
+        res=await rebuild_index(sport=sports if len(sports)>1 else sports[0], region=region)
+        built[label]={"count":res.get("count"), "seconds":round(time.time()-t0, 3)}
+        for sp, r in (res.get("sports") or {sports[0]:res}).items():
+            roster_urls.update((p["roster_url"], sp) for p in r.get("programs", []) if p.get("roster_url"))
+    if rosters and roster_urls:
+        from scraping.async_scraper import AsyncScraper
+        scraper=AsyncScraper(); sem=asyncio.Semaphore(concurrency)
+        async def one(url, sp):
+            async with sem:
+                try: await scraper.scrape_school(url, sport=sp)
+                except Exception: pass
+        await asyncio.gather(*(one(u, sp) for u, sp in sorted(roster_urls)))
+    namespaces=INDEX_NAMESPACES+(ROSTER_NAMESPACES if rosters else ())
+    out=await asyncio.to_thread(export_snapshot, path, namespaces, list(built))
+    out["built"]=built; out["rosters"]=len(roster_urls) if rosters else 0
+    return out
+
+def main(argv:Optional[List[str]]=None)->int:
+    ap=argparse.ArgumentParser(description="Build, export or inspect the prebuilt index snapshot")
+    sub=ap.add_subparsers(dest="cmd", required=True)
+    b=sub.add_parser("build", help="crawl targets through rebuild_index, then export")
+    b.add_argument("--targets", required=True, help='same syntax as WARMUP_TARGETS, e.g. "football@west;baseball@south"')
+    b.add_argument("--rosters", action="store_true", help="also scrape and include every roster found")
+    b.add_argument("--out", default=SNAPSHOT_PATH)
+    e=sub.add_parser("export", help="export what the local cache database already holds")
+    e.add_argument("--rosters", action="store_true"); e.add_argument("--out", default=SNAPSHOT_PATH)
+    i=sub.add_parser("info", help="print a snapshot's metadata")
+    i.add_argument("--path", default=SNAPSHOT_PATH)
+    opts=ap.parse_args(argv)
+    if opts.cmd=="info":
+        snap=IndexSnapshot(opts.path); snap.open(); print(json.dumps(snap.stats(), indent=2))
+        return 0 if snap.meta else 1
+    attach_snapshot(None)  # never seed a new snapshot from an old one
+    namespaces=INDEX_NAMESPACES+(ROSTER_NAMESPACES if opts.rosters else ())
+    if opts.cmd=="export":
+        out=export_snapshot(opts.out, namespaces)
+    else:
+        async def run():
+            from scraping.http import http_pool
+            await http_pool.start()
+            try:
+                return await build_snapshot(opts.targets, opts.out, opts.rosters)
+            finally:
+                await http_pool.close()
+        out=asyncio.run(run())
+    print(json.dumps(out, indent=2))
+    return 0 if any(n["entries"] for n in out["namespaces"].values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
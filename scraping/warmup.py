@@ -0,0 +1,58 @@
+
+import os, time, asyncio
+from typing import Dict, Any, List, Optional, Tuple
+
+# "football@west;mens basketball,womens basketball@south"
+WARMUP_TARGETS = os.getenv("WARMUP_TARGETS", "")
+WARMUP_INTERVAL_HOURS = float(os.getenv("WARMUP_INTERVAL_HOURS", "12"))
+WARMUP_DELAY_SECONDS = float(os.getenv("WARMUP_DELAY_SECONDS", "5"))
+
+def parse_targets(spec:str)->List[Tuple[List[str],str]]:
+    out=[]
+    for part in (spec or "").split(";"):
+        if "@" not in part: continue
+        sports, region = part.rsplit("@", 1)
+        sports=[s.strip() for s in sports.split(",") if s.strip()]
+        if sports and region.strip(): out.append((sports, region.strip()))
+    return out
+
+# in-process scheduler that pre-warms (sports, region) combos through rebuild_index at startup and on an interval
+class WarmupScheduler:
+    def __init__(self, rebuild, targets:Optional[List[Tuple[List[str],str]]]=None,
+                 interval_hours:float=WARMUP_INTERVAL_HOURS, delay_seconds:float=WARMUP_DELAY_SECONDS):
+        self.rebuild=rebuild; self.targets=parse_targets(WARMUP_TARGETS) if targets is None else targets
+        self.interval=interval_hours*3600.0; self.delay=delay_seconds
+        self._task:Optional[asyncio.Task]=None
+        self.runs=0; self.last_run:Dict[str,Dict[str,Any]]={}; self.next_run_at:Optional[float]=None
+    @property
+    def enabled(self)->bool:
+        return bool(self.targets) and self.interval>0
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task=asyncio.ensure_future(self._loop())
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try: await self._task
+            except (asyncio.CancelledError, Exception): pass
+            self._task=None
+    async def run_once(self):
+        self.runs+=1
+        for sports, region in self.targets:
+            label="{}@{}".format(",".join(sports), region); t0=time.time()
+            try:
+                res=await self.rebuild(sport=sports if len(sports)>1 else sports[0], region=region)
+                self.last_run[label]={"at":t0, "seconds":round(time.time()-t0,3), "count":res.get("count"), "error":None}
+            except Exception as e:
+                self.last_run[label]={"at":t0, "seconds":round(time.time()-t0,3), "count":None, "error":str(e)}
+    async def _loop(self):
+        self.next_run_at=time.time()+self.delay
+        await asyncio.sleep(self.delay)
+        while True:
+            await self.run_once()
+            self.next_run_at=time.time()+self.interval
+            await asyncio.sleep(self.interval)
+    def stats(self)->Dict[str,Any]:
+        return {"enabled":self.enabled, "running":self._task is not None and not self._task.done(),
+                "targets":["{}@{}".format(",".join(s), r) for s, r in self.targets], "interval_seconds":self.interval,
+                "runs":self.runs, "next_run_at":self.next_run_at, "last_run":self.last_run}
@@ -0,0 +1,10 @@
+
+# every on-disk tier goes to a throwaway directory before any scraping module opens its database
+import os, tempfile
+
+_tmp = tempfile.mkdtemp(prefix="phoenix-tests-")
+os.environ["CACHE_DB_PATH"] = os.path.join(_tmp, "cache.sqlite3")
+os.environ["RAW_STORE_PATH"] = os.path.join(_tmp, "raw.sqlite3")
+os.environ["ROSTER_HISTORY_PATH"] = ""
+os.environ["SNAPSHOT_PATH"] = ""
+os.environ["WARMUP_TARGETS"] = ""
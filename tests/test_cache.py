@@ -0,0 +1,25 @@
+
+import asyncio
+from scraping.cache import TieredCache
+
+# an entry too large for memory is answered from disk, and still reports when it was written
+def test_get_entry_returns_stored_write_time(monkeypatch):
+    c = TieredCache("test_entry_ts", 60, max_bytes=1)
+    monkeypatch.setattr("scraping.cache.time.time", lambda: 1000.0)
+    c.set("k", {"rows": list(range(50))})
+    monkeypatch.setattr("scraping.cache.time.time", lambda: 1030.0)
+    assert not c._mem
+    assert c.get_entry("k") == ({"rows": list(range(50))}, 1000.0)
+
+# a disk read that finishes after a newer write does not replace it, in memory or on disk
+def test_async_read_does_not_clobber_newer_write():
+    c = TieredCache("test_async_order", 60)
+    c.set("k", {"v": 1}); c._mem.clear()
+    async def run():
+        read = asyncio.ensure_future(c.aget("k")); await asyncio.sleep(0)
+        await c.aset("k", {"v": 2})
+        assert await read == {"v": 2}
+        return await c.aget("k")
+    assert asyncio.run(run()) == {"v": 2}
+    c._mem.clear()
+    assert c.get("k") == {"v": 2}
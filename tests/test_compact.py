@@ -0,0 +1,37 @@
+
+import pytest
+from scraping.compact import pack, unpack, footprint, symbols, Table
+
+ROSTER = {
+    "name": "Bench", "source_url": "https://example.edu/sports/football/roster",
+    "players": [{"name": "Player {}".format(i), "position": "QB" if i % 2 else "WR", "seasons": [2024, 2025][: i % 3]} for i in range(10)],
+    "positions": {"qb": 5, "wr": 5}, "features": {"positions": {"qb": 5, "wr": 5}, "turnover": {}, "pressure": {"qb": 0.4}},
+}
+PROGRAMS = {
+    "programs": [{"school": "A", "state": "CA", "association": "NCAA", "division": "Division I", "roster_url": None},
+                 {"school": "B", "state": "OR", "association": None, "athletics_url": "https://b.example/"}],
+    "states": ["CA", "OR"], "diag": None,
+}
+
+@pytest.mark.parametrize("value", [
+    ROSTER, PROGRAMS, [{}, {}], [{}], [], {}, [{"a": 1}, {}], [[{"x": [1, 2]}], []], {"rows": [{}, {}, {}]},
+    [{"nested": {"state": "WA"}}, {"nested": [{"k": 1}]}], "text", 3, None,
+])
+def test_round_trip(value):
+    assert unpack(pack(value)) == value
+
+def test_unpack_returns_fresh_objects():
+    packed = pack(ROSTER)
+    first = unpack(packed); first["players"][0]["name"] = "changed"; first["players"].append({})
+    assert unpack(packed) == ROSTER
+
+def test_only_closed_fields_are_interned():
+    before = len(symbols)
+    pack([{"position": "Position {}".format(i), "conference": "Conference {}".format(i), "state": "CA"} for i in range(50)])
+    assert len(symbols) - before <= 1
+
+def test_footprint_counts_packed_size():
+    plain = {"programs": [dict(p, school="School {}".format(i)) for i, p in enumerate(PROGRAMS["programs"] * 50)]}
+    packed = pack(plain)
+    assert isinstance(packed["programs"], Table)
+    assert 0 < footprint(packed) < footprint(plain)
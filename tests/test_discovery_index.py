@@ -0,0 +1,54 @@
+
+import asyncio, base64, json
+from urllib.parse import urlparse
+import pytest
+from scraping import discovery
+from scraping.index import program_index
+from scraping.probes import probe_planner
+
+SCHOOLS = ["Alpha", "Beta", "Gamma", "Delta"]
+
+def _page(url):
+    u = urlparse(url); path = u.path.rstrip("/")
+    if u.netloc == "en.wikipedia.org" and path.endswith("_in_Oregon"):
+        rows = "".join("<tr><td><a href='/wiki/{0}_College'>{0} College</a></td><td>NCAA Division I</td><td>Conf</td></tr>".format(s) for s in SCHOOLS)
+        return "<table class='wikitable'><tr><th>School</th><th>Association</th><th>Conference</th></tr>{}</table>".format(rows)
+    if u.netloc == "en.wikipedia.org" and path.startswith("/wiki/"):
+        slug = path.rsplit("/", 1)[1].split("_")[0].lower()
+        return "<table class='infobox'><tr><td><a href='https://{}athletics.com/'>Athletics</a></td></tr></table>".format(slug)
+    if u.netloc.endswith("athletics.com") and path in ("/sports/football/roster", "/sports/baseball/roster"):
+        return "<html><body>roster</body></html>"
+    return None
+
+@pytest.fixture
+def site(monkeypatch):
+    fetched = []
+    async def fetch(session, url):
+        fetched.append(url)
+        await asyncio.sleep(0.01)
+        body = _page(url)
+        return (200, body) if body is not None else (404, "")
+    monkeypatch.setattr(discovery, "_fetch", fetch)
+    for c in (program_index.states, program_index.schools, discovery.discovery_cache, probe_planner.negative, probe_planner.plans): c.clear()
+    return fetched
+
+# two sports crawled at once share the school entries: one athletics lookup per school, and both rosters kept
+def test_concurrent_sports_share_the_index(site):
+    async def both():
+        return await asyncio.gather(*(discovery.discover_programs(sp, states=["OR"], sources="wiki", cache_hours=0) for sp in ("football", "baseball")))
+    football, baseball = asyncio.run(both())
+    assert football["count"] == baseball["count"] == len(SCHOOLS)
+    assert sum("/wiki/" in u and "_in_" not in u for u in site) == len(SCHOOLS)
+    async def entries():
+        recs = await program_index.get_state("OR", float("inf"))
+        return [await program_index.get_school(program_index.school_key(rec)) for rec in recs]
+    entries = asyncio.run(entries())
+    assert len(entries) == len(SCHOOLS)
+    for entry in entries:
+        assert set(entry["rosters"]) == {"football,fb", "baseball,bsb"}
+
+@pytest.mark.parametrize("body", [{"v": 2, "sports": ["football"], "states": ["OR"], "since": 0}, {"v": 1, "sports": [], "states": ["OR"]}, ["v"], "x"])
+def test_malformed_continuation_is_rejected(body):
+    token = base64.urlsafe_b64encode(json.dumps(body).encode("utf-8")).decode("ascii")
+    with pytest.raises(ValueError, match="Invalid continuation token"):
+        discovery.decode_continuation(token)
@@ -0,0 +1,46 @@
+
+# Runs every extractor fixture through both HTML backends. Fixtures are named <extractor>-<case>.html; the ones
+# under divergent/ are pages html.parser and lxml build different trees for, pinned here so a change shows up.
+import os, glob
+import pytest
+from bs4 import BeautifulSoup
+from scraping import extract
+
+pytestmark = pytest.mark.skipif(not extract._HAS_LXML, reason="lxml not installed")
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "extract")
+PAGE_URL = "https://example.edu/page/"
+
+def _both(name:str):
+    kind=os.path.basename(name).split("-")[0]
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f: html=f.read()
+    if kind=="state": return extract._lx_state_records(html, "OR"), extract._bs_state_records(html, "OR")
+    if kind=="school_wiki": return extract._lx_school_wiki_links(html), extract._bs_school_wiki_links(html)
+    if kind=="school_page": return extract._lx_athletics_from_school_page(html, PAGE_URL), extract._bs_athletics_from_school_page(html, PAGE_URL)
+    if kind=="roster_link": return extract._lx_roster_link(html, PAGE_URL), extract._bs_roster_link(html, PAGE_URL)
+    if kind=="players": return extract._lx_players(html), extract.players_from_soup(BeautifulSoup(html, "html.parser"))
+    raise ValueError("unknown fixture kind: "+name)
+
+PARITY = sorted(os.path.basename(p) for p in glob.glob(os.path.join(FIXTURES, "*.html")))
+
+@pytest.mark.parametrize("name", PARITY)
+def test_backends_agree(name):
+    lx, bs = _both(name)
+    assert lx == bs
+
+# html.parser never closes an open <td>/<th> implicitly, so each cell swallows the rest of the row and every
+# later row; lxml applies the HTML5 rules and closes them
+def test_divergent_omitted_cell_end_tags():
+    lx, bs = _both(os.path.join("divergent", "state-omitted_end_tags.html"))
+    assert [r["school"] for r in lx] == ["Alpha College", "Beta University"]
+    assert bs[0]["school"].startswith("Alpha College NCAA")
+    lx, bs = _both(os.path.join("divergent", "players-omitted_end_tags.html"))
+    assert [p["name"] for p in lx] == ["Ana Ruiz", "Bea Cole"]
+    assert [p["name"] for p in bs] != [p["name"] for p in lx]
+
+# an <a> opened inside another <a>: lxml closes the outer anchor first, html.parser nests them, so the outer
+# anchor's text contains "Roster" and wins
+def test_divergent_nested_anchor():
+    lx, bs = _both(os.path.join("divergent", "roster_link-nested_anchor.html"))
+    assert lx == "https://example.edu/sports/soccer/roster"
+    assert bs == "https://example.edu/sports/soccer"
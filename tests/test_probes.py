@@ -0,0 +1,45 @@
+
+import asyncio
+import pytest
+from scraping import discovery
+from scraping.probes import probe_planner
+
+BASE = "https://ath.example.edu"
+
+@pytest.fixture(autouse=True)
+def clean_planner():
+    probe_planner.negative.clear(); probe_planner.plans.clear()
+    yield
+    probe_planner.negative.clear(); probe_planner.plans.clear()
+
+# the football page says "roster" without linking one; the homepage only links the basketball roster
+PAGES = {
+    BASE+"/sports/football": "<html><body><h1>Football</h1><p>The full roster is announced in August.</p></body></html>",
+    BASE: "<html><body><a href='/sports/mens-basketball/roster'>Men's Basketball Roster</a></body></html>",
+}
+
+def _site(fetched):
+    async def fetch(session, url):
+        fetched.append(url)
+        return (200, PAGES[url]) if url in PAGES else (404, "")
+    return fetch
+
+def test_homepage_link_is_tried_last(monkeypatch):
+    monkeypatch.setattr(discovery, "_fetch", _site([]))
+    assert asyncio.run(discovery._try_roster(None, BASE, "football")) == BASE+"/sports/football"
+
+def test_homepage_link_is_never_promoted():
+    async def run():
+        for host in ("a.edu", "b.edu", "c.edu"): await probe_planner.record(host, "link_home", 0)
+        assert (await probe_planner.plan("newhost.edu"))[-1] == "link_home"
+        assert (await probe_planner.plan("a.edu"))[-1] == "link_home"
+    asyncio.run(run())
+
+def test_link_miss_does_not_hide_page_from_direct_probe(monkeypatch):
+    fetched = []
+    monkeypatch.setattr(discovery, "_fetch", _site(fetched))
+    assert asyncio.run(discovery._try_roster(None, BASE, "football")) == BASE+"/sports/football"
+    assert asyncio.run(probe_planner.plan("ath.example.edu"))[0] == "sports_page"
+    fetched.clear()
+    assert asyncio.run(discovery._try_roster(None, BASE, "football")) == BASE+"/sports/football"
+    assert fetched == [BASE+"/sports/football"]
@@ -0,0 +1,21 @@
+
+import asyncio
+from scraping.scheduler import FetchScheduler
+
+# waiters cancelled while queued leave no empty heap or rotation entry behind
+def test_cancelled_waiters_release_their_host():
+    async def run():
+        s = FetchScheduler(max_inflight=1, per_host=1, rate=1000.0, burst=10.0, overrides={})
+        async def hold(url, gate):
+            async with s.slot(url): await gate.wait()
+        gate = asyncio.Event()
+        holder = asyncio.ensure_future(hold("https://a.example/", gate)); await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(hold("https://b.example/{}".format(i), gate)) for i in range(3)]
+        await asyncio.sleep(0)
+        assert s.stats()["hosts_waiting"] == 1
+        for w in waiters: w.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        assert s.stats()["hosts_waiting"] == 0 and not s.rotation
+        gate.set(); await holder
+        assert s.inflight == 0 and not s.queues and not s.rotation
+    asyncio.run(run())
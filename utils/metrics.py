@@ -0,0 +1,124 @@
+
+import os, time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "phoenix")
+TRACE_MAX_EVENTS = int(os.getenv("TRACE_MAX_EVENTS", "500"))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "stage_seconds": "Latency of pipeline stages (fetch, parse, resolve, probe, scrape, score, discover)",
+    "fetch_bytes_total": "Response bytes by where they came from (network download, raw-store reuse)",
+    "probe_attempts_total": "Roster probe attempts by URL template and outcome",
+    "parse_reused_total": "Parse results served from the content-hash memo instead of re-parsing",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(d:Dict[str,Any])->Labels:
+    return tuple(sorted((k, str(v)) for k, v in d.items()))
+
+def _fmt_labels(labels:Labels, extra:Optional[Tuple[str,str]]=None)->str:
+    items=list(labels)+([extra] if extra else [])
+    if not items: return ""
+    esc=lambda v: v.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return "{" + ",".join('{}="{}"'.format(k, esc(v)) for k, v in items) + "}"
+
+class _Histogram:
+    __slots__=("counts","sum","count")
+    def __init__(self):
+        self.counts=[0]*(len(LATENCY_BUCKETS)+1); self.sum=0.0; self.count=0
+    def observe(self, v:float):
+        self.counts[bisect_left(LATENCY_BUCKETS, v)]+=1; self.sum+=v; self.count+=1
+
+# per-request trace, only collected when a caller asks for diag output
+class Trace:
+    def __init__(self, max_events:int=TRACE_MAX_EVENTS):
+        self.t0=time.perf_counter(); self.max_events=max_events; self.events:List[Dict[str,Any]]=[]; self.dropped=0
+        self.stages:Dict[str,List[float]]={}
+    def add(self, stage:str, seconds:float, labels:Dict[str,Any], fields:Dict[str,Any]):
+        st=self.stages.setdefault(stage, [0, 0.0, 0.0]); st[0]+=1; st[1]+=seconds; st[2]=max(st[2], seconds)
+        if len(self.events) < self.max_events:
+            start=time.perf_counter()-self.t0-seconds
+            self.events.append({"stage":stage, "start_ms":round(1000*start, 1), "ms":round(1000*seconds, 2), **labels, **fields})
+        else:
+            self.dropped+=1
+    def summary(self)->Dict[str,Any]:
+        return {
+            "total_ms":round(1000*(time.perf_counter()-self.t0), 1),
+            "stages":{s:{"count":int(c), "ms_total":round(1000*t, 1), "ms_max":round(1000*m, 1)} for s, (c, t, m) in self.stages.items()},
+            "events":self.events, "dropped_events":self.dropped,
+        }
+
+_trace:ContextVar[Optional[Trace]]=ContextVar("diag_trace", default=None)
+
+def current_trace()->Optional[Trace]:
+    return _trace.get()
+
+# starts a trace for this request (tasks spawned inside share it) unless one is already running
+@contextmanager
+def tracing(enabled:bool=True):
+    if not enabled or _trace.get() is not None:
+        yield _trace.get(); return
+    tr=Trace(); token=_trace.set(tr)
+    try:
+        yield tr
+    finally:
+        _trace.reset(token)
+
+# counters and latency histograms kept in plain dicts; component stats are pulled in by collectors at scrape time
+class Metrics:
+    def __init__(self):
+        self.counters:Dict[Tuple[str,Labels],float]={}; self.histograms:Dict[Tuple[str,Labels],_Histogram]={}
+        self.collectors:List[Callable[[],List[Tuple[str,str,Dict[str,Any],float]]]]=[]
+    def inc(self, name:str, value:float=1, **labels):
+        key=(name, _labels(labels)); self.counters[key]=self.counters.get(key, 0)+value
+    def observe(self, name:str, seconds:float, **labels):
+        key=(name, _labels(labels)); h=self.histograms.get(key)
+        if h is None: h=self.histograms[key]=_Histogram()
+        h.observe(seconds)
+    def record(self, stage:str, seconds:float, labels:Optional[Dict[str,Any]]=None, **fields):
+        labels=labels or {}
+        self.observe("stage_seconds", seconds, stage=stage, **labels)
+        tr=_trace.get()
+        if tr is not None: tr.add(stage, seconds, labels, fields)
+    @contextmanager
+    def timed(self, stage:str, **labels):
+        t0=time.perf_counter(); fields:Dict[str,Any]={}
+        try:
+            yield fields
+        finally:
+            self.record(stage, time.perf_counter()-t0, labels, **fields)
+    def collector(self, fn:Callable[[],List[Tuple[str,str,Dict[str,Any],float]]]):
+        self.collectors.append(fn); return fn
+    def render(self)->str:
+        out:List[str]=[]; typed=set()
+        def head(name:str, kind:str, short:str):
+            if name in typed: return
+            typed.add(name)
+            if short in HELP: out.append("# HELP {} {}".format(name, HELP[short]))
+            out.append("# TYPE {} {}".format(name, kind))
+        for (name, labels), v in sorted(self.counters.items()):
+            full="{}_{}".format(METRICS_PREFIX, name); head(full, "counter", name)
+            out.append("{}{} {}".format(full, _fmt_labels(labels), v))
+        for (name, labels), h in sorted(self.histograms.items()):
+            full="{}_{}".format(METRICS_PREFIX, name); head(full, "histogram", name)
+            acc=0
+            for le, c in zip(LATENCY_BUCKETS+("+Inf",), h.counts):
+                acc+=c; out.append("{}_bucket{} {}".format(full, _fmt_labels(labels, ("le", str(le))), acc))
+            out.append("{}_sum{} {}".format(full, _fmt_labels(labels), round(h.sum, 6)))
+            out.append("{}_count{} {}".format(full, _fmt_labels(labels), h.count))
+        for fn in self.collectors:
+            try:
+                samples=fn()
+            except Exception:
+                continue
+            for name, kind, labels, v in samples:
+                full="{}_{}".format(METRICS_PREFIX, name); head(full, kind, name)
+                out.append("{}{} {}".format(full, _fmt_labels(_labels(labels)), v))
+        return "\n".join(out)+"\n"
+
+metrics=Metrics()
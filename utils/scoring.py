@@ -1,10 +1,45 @@
 from typing import List, Dict
+def normalize_position(position: str) -> str:
+    return (position or "").strip().lower()
+def position_index(players: List[Dict]) -> Dict[str, int]:
+    idx: Dict[str, int] = {}
+    for pl in players:
+        k = normalize_position(pl.get("position"))
+        idx[k] = idx.get(k, 0) + 1
+    return idx
+def position_keys(index: Dict[str, int], position: str) -> List[str]:
+    # same rule as the old per-player filter: substring match on the position, falling back to the whole roster
+    pos = normalize_position(position)
+    keys = [k for k in index if pos in k] if pos else []
+    return keys or list(index)
+def players_at_position(index: Dict[str, int], position: str) -> int:
+    return sum(index[k] for k in position_keys(index, position))
 def graduation_urgency_weight(class_level: str) -> float:
     return {"freshman":0.2,"sophomore":0.4,"junior":0.7,"senior":1.0}.get((class_level or "").lower(),0.5)
 def calculate_recruiting_propensity(players: List[Dict], decay: float = 0.6) -> float:
     if not players: return 1.0
-    need = 1.0 / (1.0 + float(len(players)) / 10.0)
+    # players seen on the roster for several seasons are closer to leaving
+    pressure = sum(1.0 - decay ** (len(pl.get("seasons") or []) - 1) for pl in players if len(pl.get("seasons") or []) > 1)
+    return _with_opening(propensity_from_count(len(players)), pressure / len(players))
+def propensity_from_count(n: int) -> float:
+    if n <= 0: return 1.0
+    need = 1.0 / (1.0 + float(n) / 10.0)
     return round(need, 3)
+def _with_opening(base: float, opening: float) -> float:
+    return round(min(1.0, base + (1.0 - base) * min(1.0, opening)), 3)
+def propensity_from_features(features: Dict, position: str) -> float:
+    # features come from the roster history: current counts plus decayed departures and graduation pressure per position
+    positions = features.get("positions") or {}
+    keys = position_keys(positions, position)
+    n = sum(positions[k] for k in keys)
+    if n <= 0: return 1.0
+    turnover = features.get("turnover") or {}; pressure = features.get("pressure") or {}
+    pos = normalize_position(position)
+    # departures count even when nobody is left at that position
+    gone = [k for k in turnover if pos and pos in k and k not in positions]
+    departed = sum(turnover.get(k, 0.0) for k in keys) + sum(turnover[k] for k in gone)
+    opening = (departed + sum(pressure.get(k, 0.0) for k in keys)) / (n + departed)
+    return _with_opening(propensity_from_count(n), opening)
 def final_match_score(school_propensity: float, class_level: str, alpha: float = 0.7) -> float:
     urgency = graduation_urgency_weight(class_level)
     return round((alpha*school_propensity + (1-alpha)*urgency) * 100.0, 1)